@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import cv2
 import numpy as np
 import threading
@@ -7,21 +7,311 @@ import time
 import os
 import subprocess
 import sys
+import ctypes
+import json
+import uuid
+import sqlite3
+import hashlib
+import mmap
+import heapq
+import queue
+import struct
 from datetime import datetime
 import mss
 import pyautogui
 from PIL import Image, ImageTk, ImageDraw, ImageFilter
 import pyaudio
 import wave
-from moviepy.editor import VideoFileClip, AudioFileClip
+from collections import deque
+from moviepy.editor import VideoFileClip, VideoClip, AudioFileClip, CompositeAudioClip, concatenate_videoclips, vfx
+from moviepy.config import get_setting
+from proglog import ProgressBarLogger
 import math
 
+# Optional: global mouse and keyboard hooks for the input event track
+try:
+    from pynput import mouse as pynput_mouse, keyboard as pynput_keyboard
+except ImportError:
+    pynput_mouse = None
+    pynput_keyboard = None
+
+class Settings:
+    """Typed application settings loaded from a JSON file, with named performance profiles"""
+    DEFAULTS = {
+        'output_folder': os.path.join(os.path.expanduser("~"), "Desktop", "recordings"),
+        'video_fps': 15.0,
+        'capture_scale': 1.0,
+        'raw_capture': False,
+        'hold_raw_exports': True,  # Raw captures wait in the queue for a trim or an explicit export
+        'audio_rate': 44100,
+        'audio_channels': 2,
+        'audio_chunk': 1024,
+        'audio_codec': "wav",  # wav, aac or opus
+        'audio_bitrate': "128k",
+        'cursor_size': 40,
+        'preview_interval_ms': 30,
+        'denoise_diameter': 9,
+        'denoise_sigma_color': 75.0,
+        'denoise_sigma_space': 75.0,
+        'replay_seconds': 60,
+        'replay_fps': 10.0,
+        'processing_workers': 1,
+        'proxy_enabled': False,
+        'proxy_scale': 0.5,
+        'proxy_bitrate': "500k",
+        'idle_speed': 8.0,
+        'idle_min_seconds': 2.0,
+        'idle_silence_db': -45.0,
+        'mic_gain': 1.0,
+        'system_audio_gain': 1.0,
+        'limiter_threshold': 0.89,
+        'input_events': True,  # Clicks, the cursor is always tracked
+        'record_keys': False,  # Key press times (never which key), opt-in
+        'input_poll_hz': 120.0,
+        'cursor_overlay': True,
+        'click_highlights': True,
+        'cursor_zoom': 1.0  # 1.0 disables zoom-to-cursor
+    }
+    
+    PROFILES = {
+        'performance': {
+            'video_fps': 10.0,
+            'capture_scale': 0.75,
+            'preview_interval_ms': 66,
+            'denoise_diameter': 5,
+            'replay_fps': 5.0
+        },
+        'balanced': {},
+        'quality': {
+            'video_fps': 30.0,
+            'audio_rate': 48000,
+            'preview_interval_ms': 30
+        }
+    }
+    
+    def __init__(self, filename):
+        self.filename = filename
+        self.profile = "balanced"
+        self.custom_profiles = {}  # Profiles defined in the file, e.g. from auto-tune
+        self.overrides = {}        # Individual values that win over the profile
+        self.values = dict(self.DEFAULTS)
+        self.mtime = None
+        self.load()
+    
+    def profile_names(self):
+        return list(self.PROFILES) + [name for name in self.custom_profiles if name not in self.PROFILES]
+    
+    def coerce(self, key, value):
+        """Convert a value to the type of its default, None when it can't be"""
+        default = self.DEFAULTS[key]
+        try:
+            if isinstance(default, bool):
+                if isinstance(value, str):
+                    return value.strip().lower() in ("1", "true", "yes", "on")
+                return bool(value)
+            return type(default)(value)
+        except (TypeError, ValueError):
+            print(f"Invalid value for setting '{key}': {value!r}, using default")
+            return None
+    
+    def resolve(self):
+        """Layer defaults, the active profile and overrides into typed values"""
+        values = dict(self.DEFAULTS)
+        profile = dict(self.PROFILES.get(self.profile, {}))
+        profile.update(self.custom_profiles.get(self.profile, {}))
+        for layer in (profile, self.overrides):
+            for key, value in layer.items():
+                if key not in self.DEFAULTS:
+                    print(f"Unknown setting '{key}' ignored")
+                    continue
+                value = self.coerce(key, value)
+                if value is not None:
+                    values[key] = value
+        self.values = values
+    
+    def load(self):
+        """Read the settings file, writing one with defaults if it does not exist"""
+        try:
+            if not os.path.exists(self.filename):
+                self.save()
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+            self.profile = data.get('profile', "balanced")
+            self.custom_profiles = data.get('profiles', {})
+            self.overrides = data.get('settings', {})
+            self.mtime = os.path.getmtime(self.filename)
+        except Exception as e:
+            print(f"Error loading settings: {e}")
+        self.resolve()
+    
+    def save(self):
+        try:
+            with open(self.filename, 'w') as f:
+                json.dump({
+                    'profile': self.profile,
+                    'profiles': self.custom_profiles,
+                    'settings': self.overrides
+                }, f, indent=2)
+            self.mtime = os.path.getmtime(self.filename)
+        except Exception as e:
+            print(f"Error saving settings: {e}")
+    
+    def reload_if_changed(self):
+        """Pick up edits made to the file since it was last read"""
+        try:
+            if os.path.getmtime(self.filename) != self.mtime:
+                self.load()
+                return True
+        except OSError:
+            pass
+        return False
+    
+    def set_profile(self, name, values=None):
+        """Switch profile (optionally defining it) and persist the choice"""
+        if values is not None:
+            self.custom_profiles[name] = values
+        self.profile = name
+        self.save()
+        self.resolve()
+    
+    def get(self, key):
+        return self.values[key]
+
+class AutoTuner:
+    """Short calibration capture measuring the sustainable fps per capture scale"""
+    SCALES = (1.0, 0.75, 0.5)
+    FPS_STEPS = (60.0, 30.0, 24.0, 20.0, 15.0, 10.0)
+    
+    def __init__(self, seconds_per_scale=1.5, headroom=0.7):
+        self.seconds_per_scale = seconds_per_scale
+        self.headroom = headroom  # Fraction of a frame interval the pipeline may use
+    
+    def measure(self, sct, monitor, scale, temp_filename):
+        """Average cost of grab, convert, resize and encode for one frame"""
+        width = int(monitor['width'] * scale) // 2 * 2
+        height = int(monitor['height'] * scale) // 2 * 2
+        out = cv2.VideoWriter(temp_filename, cv2.VideoWriter_fourcc(*'mp4v'), 15.0, (width, height))
+        frames = 0
+        start = time.perf_counter()
+        try:
+            while time.perf_counter() - start < self.seconds_per_scale:
+                frame = cv2.cvtColor(np.asarray(sct.grab(monitor)), cv2.COLOR_BGRA2BGR)
+                if scale != 1.0:
+                    frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                out.write(frame)
+                frames += 1
+        finally:
+            out.release()
+        return (time.perf_counter() - start) / max(frames, 1)
+    
+    def run(self, temp_filename):
+        """Pick the largest scale and highest fps that fit the frame budget"""
+        results = []
+        try:
+            with mss.mss() as sct:
+                monitor = sct.monitors[1]  # Primary monitor
+                for scale in self.SCALES:
+                    cost = self.measure(sct, monitor, scale, temp_filename)
+                    sustainable = self.headroom / cost
+                    fps = next((step for step in self.FPS_STEPS if step <= sustainable), None)
+                    print(f"Auto-tune: scale {scale:.2f} costs {cost * 1000:.1f} ms/frame, "
+                          f"sustains {fps or 0:.0f} fps")
+                    results.append((scale, fps))
+                    # Good enough at this size, smaller scales would only lose detail
+                    if fps is not None and fps >= 15.0:
+                        break
+        finally:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+        
+        usable = [(scale, fps) for scale, fps in results if fps is not None]
+        if not usable:
+            return {'capture_scale': self.SCALES[-1], 'video_fps': self.FPS_STEPS[-1]}
+        scale, fps = max(usable, key=lambda result: (result[1] >= 15.0, result[0], result[1]))
+        return {'capture_scale': scale, 'video_fps': fps}
+
+def get_display_refresh_rate():
+    """Refresh rate of the primary display in Hz, 60 when it can't be queried"""
+    try:
+        if sys.platform == "win32":
+            hdc = ctypes.windll.user32.GetDC(0)
+            rate = ctypes.windll.gdi32.GetDeviceCaps(hdc, 116)  # VREFRESH
+            ctypes.windll.user32.ReleaseDC(0, hdc)
+            if rate > 1:
+                return rate
+    except Exception as e:
+        print(f"Could not query display refresh rate: {e}")
+    return 60
+
+class PreviewRenderer:
+    """Draws preview frames into one reused PhotoImage and canvas image item"""
+    def __init__(self, canvas, width, height, mode="RGB", refresh_rate=60):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.photo = None
+        self.item = None
+        self.signature = None
+        self.min_interval_ms = 1000.0 / refresh_rate  # Never draw faster than the display
+        self.hidden_interval_ms = 250  # Poll rate while the canvas is not visible
+        
+        # Main-thread drawing statistics
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+        self.draw_time = 0.0
+    
+    def is_visible(self):
+        try:
+            return bool(self.canvas.winfo_viewable())
+        except tk.TclError:
+            return False
+    
+    def is_unchanged(self, frame, threshold=1.0):
+        """Compare a decimated copy of the frame with the previous one"""
+        signature = frame[::8, ::8].astype(np.int16)
+        unchanged = (self.signature is not None and signature.shape == self.signature.shape
+                     and np.mean(np.abs(signature - self.signature)) < threshold)
+        if unchanged:
+            self.frames_skipped += 1
+        else:
+            self.signature = signature
+        return unchanged
+    
+    def draw(self, image):
+        """Paste new pixels into the existing image item"""
+        started = time.perf_counter()
+        if self.photo is None or self.item is None:
+            self.photo = ImageTk.PhotoImage(self.mode, (self.width, self.height))
+            self.item = self.canvas.create_image(self.width // 2, self.height // 2, image=self.photo)
+        self.photo.paste(image)
+        self.frames_drawn += 1
+        self.draw_time += time.perf_counter() - started
+    
+    def reset(self):
+        """Forget the canvas item after the canvas was cleared elsewhere"""
+        self.item = None
+        self.signature = None
+    
+    def next_delay(self, interval_ms, started):
+        """Delay until the next tick, accounting for the time this tick took"""
+        if not self.is_visible():
+            return self.hidden_interval_ms
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return max(1, int(max(interval_ms, self.min_interval_ms) - elapsed_ms))
+    
+    def report(self, name):
+        if self.frames_drawn:
+            print(f"{name}: {self.frames_drawn} frames drawn, {self.frames_skipped} skipped, "
+                  f"{self.draw_time / self.frames_drawn * 1000:.2f} ms per draw")
+
 class SelfViewWindow:
     def __init__(self, parent):
         self.window = None
         self.cap = None
         self.is_running = False
         self.canvas = None
+        self.renderer = None
         self.parent = parent  # Reference to main app for getting selected camera
         
     def create_window(self):
@@ -45,8 +335,17 @@ class SelfViewWindow:
         self.canvas.bind('<Button-1>', self.start_drag)
         self.canvas.bind('<B1-Motion>', self.on_drag)
         
-        # Create circular mask
-        self.circle_mask = None
+        # Reuse one image item for every frame
+        self.renderer = PreviewRenderer(self.canvas, 200, 200, mode="RGBA",
+                                        refresh_rate=self.parent.display_refresh_rate)
+        
+        # Create circular mask with anti-aliasing (built once, reused for every frame)
+        self.circle_mask = Image.new('L', (200, 200), 0)
+        draw = ImageDraw.Draw(self.circle_mask)
+        
+        # Draw circle with slight inset to avoid edge artifacts
+        margin = 1
+        draw.ellipse([margin, margin, 200 - margin, 200 - margin], fill=255)
         
         # Initialize camera with selected device
         camera_index = self.parent.get_selected_camera_index()
@@ -70,13 +369,18 @@ class SelfViewWindow:
     
     def update_video(self):
         if self.is_running and self.cap and self.cap.isOpened():
+            started = time.perf_counter()
             ret, frame = self.cap.read()
-            if ret:
+            # Skip the filtering entirely when nothing would be seen
+            if ret and self.renderer.is_visible() and not self.renderer.is_unchanged(frame):
                 # Flip frame horizontally for mirror effect
                 frame = cv2.flip(frame, 1)
                 
                 # Apply bilateral filter to reduce noise while preserving edges
-                frame = cv2.bilateralFilter(frame, 9, 75, 75)
+                settings = self.parent.settings
+                frame = cv2.bilateralFilter(frame, settings.get('denoise_diameter'),
+                                            settings.get('denoise_sigma_color'),
+                                            settings.get('denoise_sigma_space'))
                 
                 # Additional noise reduction for dark areas
                 # Convert to grayscale temporarily to identify dark areas
@@ -123,58 +427,1733 @@ class SelfViewWindow:
                 # Create a circular image with transparent background
                 img = img.convert("RGBA")
                 
-                # Create circular mask with anti-aliasing
-                size = img.size
-                mask = Image.new('L', size, 0)
-                draw = ImageDraw.Draw(mask)
+                # Apply the mask to create transparency outside the circle
+                img.putalpha(self.circle_mask)
                 
-                # Draw circle with slight inset to avoid edge artifacts
-                margin = 1
-                draw.ellipse([margin, margin, size[0]-margin, size[1]-margin], fill=255)
+                # Paste into the existing image item
+                if self.canvas:
+                    self.renderer.draw(img)
+            
+            if self.window:
+                delay = self.renderer.next_delay(self.parent.settings.get('preview_interval_ms'), started)
+                self.window.after(delay, self.update_video)
+    
+    def close_window(self):
+        self.is_running = False
+        if self.renderer:
+            self.renderer.report("Self view")
+            self.renderer = None
+        if self.cap:
+            self.cap.release()
+        if self.window:
+            self.window.destroy()
+            self.window = None
+
+class AudioConverter:
+    """Streaming channel map and linear-interpolation resampler for int16 PCM"""
+    def __init__(self, in_rate, in_channels, out_rate, out_channels):
+        self.in_rate = in_rate
+        self.in_channels = in_channels
+        self.out_rate = out_rate
+        self.out_channels = out_channels
+        self.nominal_ratio = in_rate / out_rate
+        self.ratio = self.nominal_ratio  # Input samples advanced per output sample
+        self.position = 1.0  # Next output position, index 0 holds the previous chunk's last sample
+        self.last = None
+    
+    def set_drift(self, factor):
+        """Nudge the resampling ratio to follow a drifting device clock"""
+        self.ratio = self.nominal_ratio * factor
+    
+    def is_passthrough(self):
+        return self.ratio == 1.0 and self.in_channels == self.out_channels
+    
+    def map_channels(self, samples):
+        """(frames, in_channels) to (frames, out_channels)"""
+        if self.in_channels == self.out_channels:
+            return samples
+        if self.out_channels == 1:
+            return samples.mean(axis=1, keepdims=True)
+        if self.in_channels == 1:
+            return np.repeat(samples, self.out_channels, axis=1)
+        if self.in_channels > self.out_channels:
+            return samples[:, :self.out_channels]
+        # Fewer channels than wanted: repeat the last one
+        extra = np.repeat(samples[:, -1:], self.out_channels - self.in_channels, axis=1)
+        return np.hstack([samples, extra])
+    
+    def convert(self, data):
+        """Convert one chunk of interleaved int16 bytes, state carries across chunks"""
+        if self.is_passthrough():
+            return data
+        output = self.convert_samples(data)
+        return np.clip(np.round(output), -32768, 32767).astype(np.int16).tobytes()
+    
+    def convert_samples(self, data):
+        """Convert one chunk to float32 (frames, channels) in int16 scale"""
+        samples = np.frombuffer(data, dtype=np.int16).reshape(-1, self.in_channels)
+        samples = self.map_channels(samples.astype(np.float32))
+        if self.ratio == 1.0:
+            return samples
+        
+        frame_count = len(samples)
+        if frame_count == 0:
+            return samples
+        if self.last is None:
+            self.last = samples[0]
+        
+        # Previous last sample at index 0 lets interpolation span the chunk boundary
+        extended = np.vstack([self.last[np.newaxis], samples])
+        if self.position > frame_count:
+            output_count = 0
+        else:
+            output_count = int((frame_count - self.position) / self.ratio) + 1
+        positions = self.position + np.arange(output_count) * self.ratio
+        indices = positions.astype(np.int64)
+        fractions = (positions - indices)[:, np.newaxis].astype(np.float32)
+        upper = np.minimum(indices + 1, frame_count)
+        output = extended[indices] * (1.0 - fractions) + extended[upper] * fractions
+        
+        # Re-base the position so the current last sample becomes index 0
+        self.position += output_count * self.ratio - frame_count
+        self.last = samples[-1]
+        return output
+
+class AudioSource:
+    """One capture device feeding the mixer through a fixed-size ring buffer"""
+    def __init__(self, name, stream, chunk, converter, gain=1.0, capacity=88200):
+        self.name = name
+        self.stream = stream
+        self.chunk = chunk
+        self.converter = converter
+        self.gain = gain
+        self.capacity = capacity
+        self.ring = np.zeros((capacity, converter.out_channels), dtype=np.float32)
+        self.write_count = 0  # Total frames ever written / read, positions are modulo capacity
+        self.read_count = 0
+        self.last_time = None  # Session clock time of the newest frame written
+        self.lock = threading.Lock()
+        self.primed = False  # Secondary sources contribute once aligned with the master
+        self.lag_average = 0.0
+        self.thread = None
+    
+    def available(self):
+        with self.lock:
+            return self.write_count - self.read_count
+    
+    def read_time(self):
+        """Session clock time of the next frame to be read"""
+        with self.lock:
+            return self.last_time - (self.write_count - self.read_count) / self.converter.out_rate
+    
+    def push(self, data, timestamp):
+        """Convert a device chunk to the mix format and append it to the ring"""
+        samples = self.converter.convert_samples(data)
+        count = min(len(samples), self.capacity)
+        samples = samples[-count:]
+        with self.lock:
+            start = self.write_count % self.capacity
+            first = min(count, self.capacity - start)
+            self.ring[start:start + first] = samples[:first]
+            self.ring[:count - first] = samples[first:]
+            self.write_count += count
+            self.last_time = timestamp
+            # Overrun: drop the oldest audio
+            if self.write_count - self.read_count > self.capacity:
+                self.read_count = self.write_count - self.capacity
+    
+    def pull_into(self, out):
+        """Copy the next len(out) frames into out, zero-filling an underrun"""
+        frames = len(out)
+        with self.lock:
+            count = min(frames, self.write_count - self.read_count)
+            start = self.read_count % self.capacity
+            first = min(count, self.capacity - start)
+            out[:first] = self.ring[start:start + first]
+            out[first:count] = self.ring[:count - first]
+            self.read_count += count
+        if count < frames:
+            out[count:] = 0.0
+    
+    def skip(self, frames):
+        """Drop up to frames of the oldest buffered audio, returns how many were dropped"""
+        with self.lock:
+            frames = max(0, min(frames, self.write_count - self.read_count))
+            self.read_count += frames
+        return frames
+    
+    def capture_worker(self, recorder):
+        """Read a secondary device on its own thread (the master is read by the mixer thread)"""
+        while recorder.is_recording:
+            try:
+                data = self.stream.read(self.chunk, exception_on_overflow=False)
+            except Exception as e:
+                print(f"Audio source '{self.name}' error: {e}")
+                return
+            if recorder.is_paused:
+                continue
+            self.push(data, recorder.sync_clock.now())
+
+class AudioMixer:
+    """Sample-accurate mixer of several sources into one int16 track, clocked by the first source"""
+    def __init__(self, sources, channels, block_frames=1024, limiter_threshold=0.89,
+                 limiter_release=0.05, drift_gain=0.2, max_drift=0.005):
+        self.sources = sources
+        self.channels = channels
+        self.block_frames = block_frames
+        self.limit = limiter_threshold * 32767.0
+        self.limiter_release = limiter_release  # Fraction of the gain reduction recovered per block
+        self.limiter_gain = 1.0
+        self.drift_gain = drift_gain
+        self.max_drift = max_drift
+        # Master frames held back so secondary devices have delivered the same moment (one of
+        # their reads plus one block of jitter). Output sample n is always master sample n, so
+        # this delays mixing but not the track.
+        self.cushion = 0
+        for source in sources[1:]:
+            read_frames = int(source.chunk * source.converter.out_rate / source.converter.in_rate)
+            self.cushion = max(self.cushion, read_frames + block_frames)
+        self.resync_frames = block_frames  # Misalignment that is corrected by dropping or padding
+        
+        # Every buffer is allocated once and reused for each block
+        self.mix_buffer = np.zeros((block_frames, channels), dtype=np.float32)
+        self.source_buffer = np.zeros((block_frames, channels), dtype=np.float32)
+        self.gain_ramp = np.zeros((block_frames, 1), dtype=np.float32)
+        self.ramp_steps = (np.arange(1, block_frames + 1, dtype=np.float32) / block_frames)[:, np.newaxis]
+        self.output = np.zeros((block_frames, channels), dtype=np.int16)
+    
+    def mix_available(self):
+        """Yield (session time, bytes) for every block the master can release"""
+        master = self.sources[0]
+        while master.available() >= self.block_frames + self.cushion:
+            yield self.mix_block()
+    
+    def flush(self):
+        """Mix what is left of the master source at the end of a session"""
+        blocks = []
+        master = self.sources[0]
+        while master.available() >= self.block_frames:
+            blocks.append(self.mix_block()[1])
+        remaining = master.available()
+        if remaining > 0:
+            blocks.append(self.mix_block()[1][:remaining * self.channels * 2])
+        return b''.join(blocks)
+    
+    def mix_block(self):
+        mix = self.mix_buffer
+        buffer = self.source_buffer
+        master = self.sources[0]
+        master_time = master.read_time()
+        
+        # Sum sources with their gain
+        master.pull_into(buffer)
+        np.multiply(buffer, master.gain, out=mix)
+        for source in self.sources[1:]:
+            if not self.pull_secondary(source, buffer, master_time):
+                continue
+            buffer *= source.gain
+            mix += buffer
+        
+        self.apply_limiter(mix)
+        
+        np.clip(mix, -32768, 32767, out=mix)
+        np.copyto(self.output, mix, casting='unsafe')
+        return master_time, self.output.tobytes()
+    
+    def pull_secondary(self, source, buffer, master_time):
+        """Pull the secondary frames captured at the same session time as the master block"""
+        if source.last_time is None:
+            return False
+        
+        # Frames by which the secondary's read position trails the master's on the session clock
+        lag = (master_time - source.read_time()) * source.converter.out_rate
+        
+        if not source.primed or abs(lag) > self.resync_frames:
+            # Align by dropping stale audio, or by padding when the source starts within this block
+            padding = 0
+            if lag > 0:
+                if source.skip(int(round(lag))) < int(round(lag)):
+                    source.primed = False
+                    return False
+            else:
+                padding = int(round(-lag))
+                if padding >= self.block_frames:
+                    source.primed = False
+                    return False
+            source.primed = True
+            source.lag_average = 0.0
+            source.converter.set_drift(1.0)
+            buffer[:padding] = 0.0
+            source.pull_into(buffer[padding:])
+            return True
+        
+        # A faster device clock makes the source trail: consume its input a little faster, and vice versa
+        source.lag_average += 0.05 * (lag - source.lag_average)
+        correction = self.drift_gain * source.lag_average / self.block_frames
+        source.converter.set_drift(1.0 + max(-self.max_drift, min(self.max_drift, correction)))
+        
+        source.pull_into(buffer)
+        return True
+    
+    def apply_limiter(self, mix):
+        """Peak limiter: instant attack, gain ramped back up over the following blocks"""
+        peak = float(np.max(np.abs(mix)))
+        target = self.limit / peak if peak > self.limit else 1.0
+        
+        if target < self.limiter_gain:
+            # Attack: clamp the whole block so the peak fits
+            self.limiter_gain = target
+            mix *= target
+        elif self.limiter_gain < 1.0:
+            # Release: ramp smoothly towards unity (or the block's own limit)
+            new_gain = min(target, self.limiter_gain + (1.0 - self.limiter_gain) * self.limiter_release)
+            np.multiply(self.ramp_steps, new_gain - self.limiter_gain, out=self.gain_ramp)
+            self.gain_ramp += self.limiter_gain
+            mix *= self.gain_ramp
+            self.limiter_gain = new_gain
+
+class AudioEncoder:
+    """Encodes PCM to AAC or Opus on the fly through ffmpeg, fed from a worker thread"""
+    CODECS = {
+        'aac': ('aac', '.m4a', []),
+        'opus': ('libopus', '.ogg', ['-ar', '48000'])  # Opus only supports 48 kHz and divisors
+    }
+    
+    def __init__(self, filename, rate, channels, codec="aac", bitrate="128k"):
+        codec_name, _, extra_args = self.CODECS[codec]
+        command = [get_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error',
+                   '-f', 's16le', '-ar', str(rate), '-ac', str(channels), '-i', '-',
+                   '-c:a', codec_name, '-b:a', bitrate] + extra_args + [filename]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.worker)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    @classmethod
+    def extension(cls, codec):
+        return cls.CODECS[codec][1] if codec in cls.CODECS else ".wav"
+    
+    def write(self, data):
+        """Queue a PCM chunk, never blocks the capture thread on the encoder"""
+        self.queue.put(data)
+    
+    def worker(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                return
+            try:
+                self.process.stdin.write(data)
+            except (BrokenPipeError, OSError) as e:
+                print(f"Audio encoder error: {e}")
+                return
+    
+    def close(self):
+        """Flush the queue and wait for ffmpeg to finish the file"""
+        self.queue.put(None)
+        self.thread.join()
+        _, errors = self.process.communicate()
+        if self.process.returncode != 0:
+            raise RuntimeError(f"ffmpeg audio encode failed: {errors.decode(errors='ignore').strip()}")
+
+class SyncClock:
+    """Shared monotonic clock used to timestamp the audio and video of one session"""
+    def __init__(self):
+        self.start_time = None
+        self.video_timestamps = []  # Capture time of every written frame
+        self.audio_chunks = []      # (read completion time, frames in chunk)
+        self.paused_at = None
+        self.paused_total = 0.0
+    
+    def start(self):
+        """Reset the clock at the start of a session"""
+        self.video_timestamps = []
+        self.audio_chunks = []
+        self.paused_at = None
+        self.paused_total = 0.0
+        self.start_time = time.perf_counter()
+    
+    def now(self):
+        """Seconds elapsed on the session clock, excluding time spent paused"""
+        current = self.paused_at if self.paused_at is not None else time.perf_counter()
+        return current - self.start_time - self.paused_total
+    
+    def pause(self):
+        """Freeze the clock so the paused span is spliced out of the timeline"""
+        if self.paused_at is None:
+            self.paused_at = time.perf_counter()
+    
+    def resume(self):
+        """Continue the clock from where it was paused"""
+        if self.paused_at is not None:
+            self.paused_total += time.perf_counter() - self.paused_at
+            self.paused_at = None
+    
+    def mark_video_frame(self, timestamp):
+        self.video_timestamps.append(timestamp)
+    
+    def mark_audio_chunk(self, timestamp, frame_count):
+        self.audio_chunks.append((timestamp, frame_count))
+    
+    def compute_video_sync(self, nominal_fps):
+        """Measure the video start and real frame rate, for sessions without audio"""
+        if not self.video_timestamps:
+            return None
+        
+        # Fit frame timestamps against frame numbers: slope is the real frame interval
+        frame_times = np.array(self.video_timestamps, dtype=np.float64)
+        if len(frame_times) >= 2:
+            interval, video_start = np.polyfit(np.arange(len(frame_times)), frame_times, 1)
+        else:
+            interval, video_start = 1.0 / nominal_fps, frame_times[0]
+        
+        return {
+            'video_start': float(video_start),
+            'video_fps': float(1.0 / interval),
+            'video_duration': float(len(frame_times) * interval)
+        }
+    
+    def compute_sync(self, nominal_fps, nominal_rate):
+        """Measure stream start offsets, real frame rate and audio clock drift"""
+        if not self.video_timestamps or not self.audio_chunks:
+            return None
+        video_sync = self.compute_video_sync(nominal_fps)
+        video_start = video_sync['video_start']
+        
+        # Fit chunk completion times against the running sample count: the slope
+        # gives the real device sample rate, the intercept the time of sample 0
+        chunk_times = np.array([chunk[0] for chunk in self.audio_chunks], dtype=np.float64)
+        sample_counts = np.cumsum([chunk[1] for chunk in self.audio_chunks]).astype(np.float64)
+        if len(chunk_times) >= 2:
+            seconds_per_sample, audio_start = np.polyfit(sample_counts, chunk_times, 1)
+            audio_rate = 1.0 / seconds_per_sample
+        else:
+            audio_rate = float(nominal_rate)
+            audio_start = chunk_times[0] - sample_counts[0] / audio_rate
+        
+        return {
+            'video_start': video_sync['video_start'],
+            'video_fps': video_sync['video_fps'],
+            'video_duration': video_sync['video_duration'],
+            'audio_start': float(audio_start),
+            'audio_rate': float(audio_rate),
+            'audio_duration': float(sample_counts[-1] / audio_rate),
+            'offset': float(audio_start - video_start),  # Positive when audio started late
+            'drift': float(audio_rate / nominal_rate - 1.0)
+        }
+
+class ReplayBuffer:
+    """Always-on rolling buffer of the last few seconds of screen and audio"""
+    def __init__(self, recorder, seconds=60, fps=10.0, jpeg_quality=70):
+        self.recorder = recorder  # Reference to main app for cursor overlay and audio settings
+        self.seconds = seconds
+        self.fps = fps
+        self.jpeg_quality = jpeg_quality
+        self.active = False
+        self.thread = None
+        self.lock = threading.Lock()
+        self.frames = deque()        # (timestamp, JPEG encoded frame)
+        self.audio_chunks = deque()  # (timestamp, PCM chunk)
+    
+    def start(self):
+        """Start filling the buffer in the background"""
+        if not self.active:
+            self.active = True
+            self.thread = threading.Thread(target=self.capture_worker)
+            self.thread.daemon = True
+            self.thread.start()
+    
+    def stop(self):
+        """Stop capturing and drop everything buffered"""
+        self.active = False
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+        with self.lock:
+            self.frames.clear()
+            self.audio_chunks.clear()
+    
+    def trim(self, now):
+        """Discard anything older than the buffer length (caller holds the lock)"""
+        cutoff = now - self.seconds
+        while self.frames and self.frames[0][0] < cutoff:
+            self.frames.popleft()
+        while self.audio_chunks and self.audio_chunks[0][0] < cutoff:
+            self.audio_chunks.popleft()
+    
+    def add_audio(self, data):
+        """Append a mono PCM chunk read by the audio monitor"""
+        if not self.active:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            self.audio_chunks.append((now, data))
+            self.trim(now)
+    
+    def capture_worker(self):
+        """Grab, compress and buffer screen frames at a low fixed rate"""
+        encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        frame_time = 1.0 / self.fps
+        try:
+            with mss.mss() as sct:
+                monitor = sct.monitors[1]  # Primary monitor
+                next_time = time.perf_counter()
                 
-                # Apply the mask to create transparency outside the circle
-                img.putalpha(mask)
+                while self.active:
+                    now = time.perf_counter()
+                    if now < next_time:
+                        time.sleep(min(0.01, next_time - now))
+                        continue
+                    next_time += frame_time
+                    
+                    frame = cv2.cvtColor(np.array(sct.grab(monitor)), cv2.COLOR_BGRA2BGR)
+                    try:
+                        cursor_x, cursor_y = pyautogui.position()
+                        self.recorder.overlay_cursor(frame, cursor_x, cursor_y)
+                    except:
+                        pass  # Skip if cursor position can't be obtained
+                    
+                    # Keep frames compressed so a minute of history stays small
+                    ok, encoded = cv2.imencode('.jpg', frame, encode_params)
+                    if ok:
+                        with self.lock:
+                            self.frames.append((now, encoded))
+                            self.trim(now)
+        except Exception as e:
+            print(f"Replay buffer error: {e}")
+            self.active = False
+    
+    def save(self, video_filename, audio_filename):
+        """Write the buffered history to disk, returns sync info and whether audio was written"""
+        # Snapshot under the lock so capture keeps running while we write
+        with self.lock:
+            frames = list(self.frames)
+            audio_chunks = list(self.audio_chunks)
+        
+        # Nothing is written unless there are frames to save
+        if not frames:
+            return None, False
+        
+        # Decode frames into a temporary video
+        first_frame = cv2.imdecode(frames[0][1], cv2.IMREAD_COLOR)
+        height, width = first_frame.shape[:2]
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(video_filename, fourcc, self.fps, (width, height))
+        for _, encoded in frames:
+            out.write(cv2.imdecode(encoded, cv2.IMREAD_COLOR))
+        out.release()
+        
+        # Reuse the session clock fitting to line the two streams up
+        clock = SyncClock()
+        clock.video_timestamps = [timestamp for timestamp, _ in frames]
+        
+        # Without a working input device the replay is saved as video only
+        if not audio_chunks:
+            return clock.compute_video_sync(self.fps), False
+        
+        # Audio monitor runs in mono
+        with wave.open(audio_filename, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(pyaudio.get_sample_size(self.recorder.audio_format))
+            wf.setframerate(self.recorder.audio_rate)
+            wf.writeframes(b''.join(chunk for _, chunk in audio_chunks))
+        
+        bytes_per_frame = pyaudio.get_sample_size(self.recorder.audio_format)
+        clock.audio_chunks = [(timestamp, len(chunk) // bytes_per_frame) for timestamp, chunk in audio_chunks]
+        return clock.compute_sync(self.fps, self.recorder.audio_rate), True
+
+class RawFrameWriter:
+    """Appends uncompressed BGR frames to a memory-mapped intermediate file"""
+    def __init__(self, filename, width, height, channels=3, grow_frames=64):
+        self.filename = filename
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.frame_size = width * height * channels
+        self.grow_frames = grow_frames
+        self.frame_count = 0
+        self.capacity = 0
+        self.timestamps = []
+        self.mm = None
+        self.file = open(filename, 'w+b')
+    
+    def grow(self):
+        """Extend the file by a block of frames and remap it"""
+        if self.mm:
+            self.mm.close()
+        self.capacity += self.grow_frames
+        self.file.truncate(self.capacity * self.frame_size)
+        self.mm = mmap.mmap(self.file.fileno(), self.capacity * self.frame_size)
+    
+    def next_frame(self):
+        """Writable view of the next frame slot, fill it then call commit()"""
+        if self.frame_count >= self.capacity:
+            self.grow()
+        return np.ndarray((self.height, self.width, self.channels), dtype=np.uint8,
+                          buffer=self.mm, offset=self.frame_count * self.frame_size)
+    
+    def commit(self, timestamp):
+        """Record the frame written into the slot from next_frame()"""
+        self.frame_count += 1
+        self.timestamps.append(timestamp)
+    
+    def write(self, frame, timestamp):
+        self.next_frame()[:] = frame
+        self.commit(timestamp)
+    
+    def close(self):
+        """Trim unused capacity and write the frame index next to the data"""
+        if self.mm:
+            self.mm.flush()
+            self.mm.close()
+            self.mm = None
+        self.file.truncate(self.frame_count * self.frame_size)
+        self.file.close()
+        
+        with open(self.filename + ".json", 'w') as f:
+            json.dump({
+                'format': 'bgr24',
+                'width': self.width,
+                'height': self.height,
+                'channels': self.channels,
+                'frame_count': self.frame_count,
+                'timestamps': self.timestamps
+            }, f)
+
+class RawFrameReader:
+    """Zero-copy random access to a raw intermediate written by RawFrameWriter"""
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename + ".json", 'r') as f:
+            index = json.load(f)
+        self.width = index['width']
+        self.height = index['height']
+        self.channels = index['channels']
+        self.frame_count = index['frame_count']
+        self.timestamps = np.array(index['timestamps'], dtype=np.float64)
+        
+        self.file = open(filename, 'rb')
+        self.mm = None
+        self.frames = np.zeros((0, self.height, self.width, self.channels), dtype=np.uint8)
+        if self.frame_count > 0:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.frames = np.ndarray((self.frame_count, self.height, self.width, self.channels),
+                                     dtype=np.uint8, buffer=self.mm)
+    
+    def frame_at(self, timestamp):
+        """Frame that was on screen at a session clock timestamp"""
+        index = int(np.searchsorted(self.timestamps, timestamp, side='right')) - 1
+        return self.frames[min(max(index, 0), self.frame_count - 1)]
+    
+    def to_clip(self, fps, sync_info=None):
+        """Expose the frames as a moviepy clip timed by their capture timestamps"""
+        if sync_info:
+            start = sync_info['video_start']
+            duration = sync_info['video_duration']
+        else:
+            start = self.timestamps[0] if self.frame_count else 0.0
+            duration = self.frame_count / fps
+        
+        # moviepy expects RGB, reversing the channel axis is a view
+        clip = VideoClip(lambda t: self.frame_at(start + t)[:, :, ::-1], duration=duration)
+        return clip.set_fps(fps)
+    
+    def close(self):
+        self.frames = None
+        if self.mm:
+            try:
+                self.mm.close()
+            except BufferError:
+                pass  # A frame view is still referenced, released on garbage collection
+            self.mm = None
+        self.file.close()
+
+class IdleDetector:
+    """Finds idle spans from per-frame screen change and per-chunk audio level"""
+    def __init__(self, change_threshold=0.00005, silence_db=-45.0, min_idle=2.0, padding=0.5):
+        self.change_threshold = change_threshold  # Fraction of decimated pixels that changed
+        self.silence_db = silence_db
+        self.min_idle = min_idle
+        self.padding = padding  # Activity kept on each side of a cut
+    
+    def measure_change(self, frame, previous):
+        """Decimated frame for the next call and the fraction of it that changed"""
+        small = frame[::4, ::4].astype(np.int16)
+        if previous is None:
+            return small, 1.0
+        changed = np.count_nonzero(np.abs(small - previous) > 24)
+        return small, changed / small.size
+    
+    def detect(self, video_activity, audio_levels, input_times=()):
+        """Single streaming pass over all signals, returns [start, end] spans on the session clock"""
+        if not video_activity:
+            return []
+        
+        # Merge the time-ordered signals and remember the last active moment. The cursor is not
+        # in the frames, so input events (moves, clicks, keys) count as activity on their own.
+        events = heapq.merge(((t, change >= self.change_threshold) for t, change in video_activity),
+                             ((t, level >= self.silence_db) for t, level in audio_levels),
+                             ((t, True) for t in input_times))
+        spans = []
+        last_active = video_activity[0][0]
+        for t, active in events:
+            if active:
+                self.add_span(spans, last_active, t)
+                last_active = max(last_active, t)
+        self.add_span(spans, last_active, video_activity[-1][0])
+        return spans
+    
+    def add_span(self, spans, start, end):
+        if end - start >= self.min_idle + 2 * self.padding:
+            spans.append([start + self.padding, end - self.padding])
+
+class InputEventRecorder:
+    """High-frequency cursor, click and key track written next to the video as binary records"""
+    HEADER = struct.Struct('<4sHHH')  # Magic, version, screen width, screen height
+    RECORD = struct.Struct('<dBhhH')  # Session time, event type, x, y, button code (0 for keys)
+    DTYPE = np.dtype([('t', '<f8'), ('type', 'u1'), ('x', '<i2'), ('y', '<i2'), ('code', '<u2')])
+    MAGIC = b'JRIE'
+    
+    MOVE, BUTTON_DOWN, BUTTON_UP, KEY_DOWN, KEY_UP = range(5)
+    BUTTON_CODES = {'left': 1, 'right': 2, 'middle': 3}
+    WINDOWS_BUTTONS = ((0x01, 1), (0x02, 2), (0x04, 3))  # Virtual key codes of the mouse buttons
+    
+    def __init__(self, recorder, poll_hz=120.0):
+        self.recorder = recorder  # Reference to main app for the session clock and pause state
+        self.poll_hz = poll_hz
+        self.file = None
+        self.buffer = bytearray()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.listeners = []
+        self.clicks = True
+        self.active = False
+    
+    def start(self, filename, screen_size, clicks=True, keys=False):
+        """Open the track and start polling, hooks are used for clicks and keys when wanted and available"""
+        self.file = open(filename, 'wb')
+        self.file.write(self.HEADER.pack(self.MAGIC, 1, screen_size[0], screen_size[1]))
+        self.buffer = bytearray()
+        self.clicks = clicks
+        self.active = True
+        
+        if pynput_mouse is not None:
+            try:
+                if clicks:
+                    self.listeners.append(pynput_mouse.Listener(on_click=self.on_click))
+                if keys:
+                    # Only the timing of key presses is kept, never which key was pressed
+                    self.listeners.append(pynput_keyboard.Listener(on_press=self.on_press,
+                                                                   on_release=self.on_release))
+                for listener in self.listeners:
+                    listener.start()
+            except Exception as e:
+                print(f"Input hooks unavailable, recording cursor only: {e}")
+                for listener in self.listeners:
+                    listener.stop()
+                self.listeners = []
+        
+        self.thread = threading.Thread(target=self.poll_worker)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def stop(self):
+        """Stop polling and hooks and flush the track to disk"""
+        self.active = False
+        for listener in self.listeners:
+            listener.stop()
+        self.listeners = []
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.file:
+            self.flush()
+            self.file.close()
+            self.file = None
+    
+    def add(self, event_type, x, y, code=0):
+        # Events while paused are dropped like the video frames
+        if not self.active or self.recorder.is_paused:
+            return
+        record = self.RECORD.pack(self.recorder.sync_clock.now(), event_type,
+                                  max(-32768, min(32767, int(x))), max(-32768, min(32767, int(y))), code)
+        with self.lock:
+            self.buffer += record
+    
+    def flush(self):
+        with self.lock:
+            data = bytes(self.buffer)
+            self.buffer.clear()
+        if data:
+            self.file.write(data)
+    
+    def poll_worker(self):
+        """Sample the cursor at a fixed rate, only storing positions that changed"""
+        interval = 1.0 / self.poll_hz
+        poll_buttons = self.clicks and pynput_mouse is None and sys.platform == "win32"
+        button_state = {}
+        last_position = None
+        last_flush = time.perf_counter()
+        next_time = time.perf_counter()
+        
+        while self.active:
+            try:
+                position = pyautogui.position()
+                if position != last_position:
+                    self.add(self.MOVE, position[0], position[1])
+                    last_position = position
                 
-                # Convert to PhotoImage
-                photo = ImageTk.PhotoImage(img)
+                # Without hooks, Windows can still report button state cheaply
+                if poll_buttons:
+                    for virtual_key, code in self.WINDOWS_BUTTONS:
+                        pressed = bool(ctypes.windll.user32.GetAsyncKeyState(virtual_key) & 0x8000)
+                        if pressed != button_state.get(code, False):
+                            button_state[code] = pressed
+                            self.add(self.BUTTON_DOWN if pressed else self.BUTTON_UP,
+                                     position[0], position[1], code)
+            except Exception:
+                pass  # Skip samples where the cursor position can't be obtained
+            
+            now = time.perf_counter()
+            if now - last_flush >= 1.0:
+                self.flush()
+                last_flush = now
+            
+            next_time += interval
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+    
+    def on_click(self, x, y, button, pressed):
+        code = self.BUTTON_CODES.get(getattr(button, 'name', ''), 0)
+        self.add(self.BUTTON_DOWN if pressed else self.BUTTON_UP, x, y, code)
+    
+    def on_press(self, key):
+        self.add(self.KEY_DOWN, 0, 0)
+    
+    def on_release(self, key):
+        self.add(self.KEY_UP, 0, 0)
+    
+    @classmethod
+    def read(cls, filename):
+        """Screen size and a structured array of the events in a track"""
+        with open(filename, 'rb') as f:
+            data = f.read()
+        magic, version, width, height = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"Not an input event track: {filename}")
+        body = data[cls.HEADER.size:]
+        body = body[:len(body) - len(body) % cls.RECORD.size]  # Drop a torn last record
+        return (width, height), np.frombuffer(body, dtype=cls.DTYPE)
+
+class InputOverlay:
+    """Composites cursor, click highlights and zoom-to-cursor from an event track at export"""
+    def __init__(self, recorder, events, screen_size, frame_size, time_offset=0.0,
+                 cursor=True, clicks=True, zoom=1.0, highlight_seconds=0.4, zoom_smoothing=0.5):
+        self.recorder = recorder  # Reference to main app for the cursor image and overlay
+        self.time_offset = time_offset  # Session time of clip time 0
+        self.cursor = cursor
+        self.clicks = clicks
+        self.zoom = zoom
+        self.highlight_seconds = highlight_seconds
+        self.zoom_smoothing = zoom_smoothing  # Seconds of cursor history the zoom follows
+        self.scale = frame_size[0] / screen_size[0]
+        
+        moves = events[events['type'] == InputEventRecorder.MOVE]
+        self.move_times = moves['t'].astype(np.float64)
+        self.move_x = moves['x'].astype(np.float64) * self.scale
+        self.move_y = moves['y'].astype(np.float64) * self.scale
+        
+        downs = events[events['type'] == InputEventRecorder.BUTTON_DOWN]
+        self.click_times = downs['t'].astype(np.float64)
+        self.click_x = (downs['x'] * self.scale).astype(np.int32)
+        self.click_y = (downs['y'] * self.scale).astype(np.int32)
+        
+        # Cursor image in RGBA at the export scale
+        self.cursor_image = None
+        if recorder.cursor_image is not None:
+            size = max(1, int(round(recorder.cursor_image.shape[1] * self.scale)))
+            image = cv2.cvtColor(recorder.cursor_image, cv2.COLOR_BGRA2RGBA)
+            self.cursor_image = cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA)
+    
+    def is_empty(self):
+        return len(self.move_times) == 0
+    
+    def position_at(self, t):
+        """Last sampled cursor position at a session time"""
+        index = int(np.searchsorted(self.move_times, t, side='right')) - 1
+        index = min(max(index, 0), len(self.move_times) - 1)
+        return int(self.move_x[index]), int(self.move_y[index])
+    
+    def apply(self, get_frame, t):
+        """moviepy fl filter: clip time to composited RGB frame"""
+        frame = get_frame(t)
+        if self.is_empty():
+            return frame
+        frame = np.array(frame)  # Decoded frames may be read-only
+        session_time = self.time_offset + t
+        
+        if self.clicks:
+            self.draw_clicks(frame, session_time)
+        if self.cursor:
+            x, y = self.position_at(session_time)
+            self.recorder.overlay_cursor(frame, x, y, cursor_image=self.cursor_image)
+        if self.zoom > 1.0:
+            frame = self.zoom_frame(frame, session_time)
+        return frame
+    
+    def draw_clicks(self, frame, session_time):
+        """Expanding, fading rings for clicks in the last highlight_seconds"""
+        first = int(np.searchsorted(self.click_times, session_time - self.highlight_seconds))
+        last = int(np.searchsorted(self.click_times, session_time, side='right'))
+        for index in range(first, last):
+            age = (session_time - self.click_times[index]) / self.highlight_seconds
+            radius = int((12 + 24 * age) * max(self.scale, 0.25))
+            center = (int(self.click_x[index]), int(self.click_y[index]))
+            overlay = frame.copy()
+            cv2.circle(overlay, center, radius, (255, 200, 0), -1)
+            cv2.addWeighted(overlay, 0.35 * (1.0 - age), frame, 1.0 - 0.35 * (1.0 - age), 0, dst=frame)
+    
+    def zoom_frame(self, frame, session_time):
+        """Crop around the smoothed cursor position and scale back to the frame size"""
+        height, width = frame.shape[:2]
+        crop_w = int(width / self.zoom)
+        crop_h = int(height / self.zoom)
+        
+        # Average the cursor over a short window so the view doesn't jitter
+        samples = np.linspace(session_time - self.zoom_smoothing, session_time, 8)
+        center_x = np.interp(samples, self.move_times, self.move_x).mean()
+        center_y = np.interp(samples, self.move_times, self.move_y).mean()
+        
+        left = int(min(max(center_x - crop_w / 2, 0), width - crop_w))
+        top = int(min(max(center_y - crop_h / 2, 0), height - crop_h))
+        crop = frame[top:top + crop_h, left:left + crop_w]
+        return cv2.resize(crop, (width, height), interpolation=cv2.INTER_LINEAR)
+
+class JobCancelled(Exception):
+    """Raised from the encoder progress callback to abort a running job"""
+    pass
+
+class ProcessingJob:
+    """A single post-processing (mux) job on the processing queue"""
+    def __init__(self, video_filename, audio_filename, final_filename, sync_info=None, job_id=None, devices=None):
+        self.job_id = job_id or uuid.uuid4().hex[:8]
+        self.video_filename = video_filename
+        self.audio_filename = audio_filename
+        self.final_filename = final_filename
+        self.sync_info = sync_info
+        self.devices = devices or {}  # Device names stored in the recordings index
+        self.trim = None  # Optional (start, end) in seconds applied at export
+        self.idle_spans = []  # Idle [start, end] spans on the video timeline
+        self.idle_mode = "keep"  # keep, cut or speedup
+        self.proxy_video_filename = None  # Downscaled capture (None for raw captures)
+        self.proxy_final_filename = None  # Set when a low-bitrate proxy is wanted
+        self.proxy_scale = 0.5
+        self.events_filename = None  # Input event track composited at export
+        self.defer_while_recording = video_filename.endswith(".raw")
+        self.status = "queued"  # held, queued, running, done, failed, cancelled
+        self.progress = 0.0
+        self.error = None
+        self.attempts = 0
+        self.cancel_requested = False
+    
+    def source_files(self):
+        """Capture files the job reads, removed once it is no longer needed"""
+        files = [self.video_filename]
+        if self.audio_filename:
+            files.append(self.audio_filename)
+        if self.video_filename.endswith(".raw"):
+            files.append(self.video_filename + ".json")  # Raw frame index
+        if self.proxy_video_filename:
+            files.append(self.proxy_video_filename)
+        if self.events_filename:
+            files.append(self.events_filename)
+        return files
+    
+    def output_files(self):
+        """Files the export writes, removed when it does not finish"""
+        files = [self.final_filename]
+        if self.proxy_final_filename:
+            files.append(self.proxy_final_filename)
+        return files
+    
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'video_filename': self.video_filename,
+            'audio_filename': self.audio_filename,
+            'final_filename': self.final_filename,
+            'sync_info': self.sync_info,
+            'devices': self.devices,
+            'trim': self.trim,
+            'idle_spans': self.idle_spans,
+            'idle_mode': self.idle_mode,
+            'proxy_video_filename': self.proxy_video_filename,
+            'proxy_final_filename': self.proxy_final_filename,
+            'proxy_scale': self.proxy_scale,
+            'events_filename': self.events_filename,
+            'defer_while_recording': self.defer_while_recording,
+            'status': self.status,
+            'error': self.error,
+            'attempts': self.attempts
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data['video_filename'], data['audio_filename'], data['final_filename'],
+                  data.get('sync_info'), data.get('job_id'), data.get('devices'))
+        job.trim = data.get('trim')
+        job.idle_spans = data.get('idle_spans', [])
+        job.idle_mode = data.get('idle_mode', "keep")
+        job.proxy_video_filename = data.get('proxy_video_filename')
+        job.proxy_final_filename = data.get('proxy_final_filename')
+        job.proxy_scale = data.get('proxy_scale', 0.5)
+        job.events_filename = data.get('events_filename')
+        job.defer_while_recording = data.get('defer_while_recording', job.defer_while_recording)
+        job.status = data.get('status', "queued")
+        job.error = data.get('error')
+        job.attempts = data.get('attempts', 0)
+        return job
+
+class JobProgressLogger(ProgressBarLogger):
+    """Forwards moviepy encoder progress to a job and checks for cancellation"""
+    def __init__(self, job, on_progress):
+        super().__init__()
+        self.job = job
+        self.on_progress = on_progress
+        self.stage_start = 0.0
+        self.stage_span = 1.0
+    
+    def set_stage(self, start, span):
+        """Map the following writes onto a part of the job's progress"""
+        self.stage_start = start
+        self.stage_span = span
+    
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if self.job.cancel_requested:
+            raise JobCancelled()
+        
+        if attr != 'index':
+            return
+        total = self.bars[bar].get('total') or 0
+        if total <= 0:
+            return
+        
+        # Audio ('chunk') is written before video frames ('t')
+        fraction = min(1.0, (value + 1) / total)
+        if bar == 'chunk':
+            progress = 0.1 * fraction
+        else:
+            progress = 0.1 + 0.9 * fraction
+        progress = self.stage_start + self.stage_span * progress
+        
+        # Only report whole percent steps to keep UI updates cheap
+        if int(progress * 100) != int(self.job.progress * 100):
+            self.job.progress = progress
+            self.on_progress(self.job)
+
+class ProcessingQueue:
+    """Persistent background queue that muxes finished recordings"""
+    def __init__(self, recorder, state_filename, workers=1, max_attempts=2):
+        self.recorder = recorder  # Reference to main app for the mux and UI callbacks
+        self.state_filename = state_filename
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.jobs = []
+        self.condition = threading.Condition()
+        self.threads = {}  # Worker index -> thread
+        self.active = False
+        self.load_state()
+    
+    def load_state(self):
+        """Restore jobs left unfinished by a previous run"""
+        try:
+            if os.path.exists(self.state_filename):
+                with open(self.state_filename, 'r') as f:
+                    for data in json.load(f):
+                        job = ProcessingJob.from_dict(data)
+                        # Jobs interrupted mid-encode start over
+                        if job.status == "running":
+                            job.status = "queued"
+                        # Failed or cancelled jobs whose captures are gone can never be retried
+                        if job.status in ("failed", "cancelled") and not os.path.exists(job.video_filename):
+                            continue
+                        self.jobs.append(job)
+        except Exception as e:
+            print(f"Error loading processing queue: {e}")
+    
+    def save_state(self):
+        """Persist every job that is not done yet (caller holds the lock)"""
+        try:
+            pending = [job.to_dict() for job in self.jobs if job.status != "done"]
+            with open(self.state_filename, 'w') as f:
+                json.dump(pending, f, indent=2)
+        except Exception as e:
+            print(f"Error saving processing queue: {e}")
+    
+    def start(self):
+        """Start the worker threads"""
+        self.active = True
+        self.spawn_workers()
+    
+    def spawn_workers(self):
+        """Start a worker for every index below the configured count that has none running"""
+        with self.condition:
+            for index in range(self.workers):
+                if index in self.threads:
+                    continue
+                thread = threading.Thread(target=self.worker, args=(index,))
+                thread.daemon = True
+                self.threads[index] = thread
+                thread.start()
+    
+    def set_workers(self, workers):
+        """Change the number of concurrent jobs, extra workers exit after their current job"""
+        with self.condition:
+            self.workers = max(1, workers)
+            self.condition.notify_all()
+        if self.active:
+            self.spawn_workers()
+    
+    def stop(self):
+        """Stop taking new jobs, queued jobs stay persisted for the next run"""
+        with self.condition:
+            self.active = False
+            self.condition.notify_all()
+    
+    def submit(self, job):
+        with self.condition:
+            self.jobs.append(job)
+            self.save_state()
+            self.condition.notify()
+        self.recorder.root.after(0, self.recorder.update_processing_status)
+    
+    def cancel(self, job_id):
+        with self.condition:
+            for job in self.jobs:
+                if job.job_id != job_id:
+                    continue
+                if job.status in ("held", "queued"):
+                    job.status = "cancelled"
+                    self.save_state()
+                elif job.status == "running":
+                    # The encoder progress callback aborts the write
+                    job.cancel_requested = True
+        self.recorder.root.after(0, self.recorder.update_processing_status)
+    
+    def release(self, job_id):
+        """Queue a held job for export"""
+        with self.condition:
+            for job in self.jobs:
+                if job.job_id == job_id and job.status == "held":
+                    job.status = "queued"
+                    self.save_state()
+                    self.condition.notify()
+        self.recorder.root.after(0, self.recorder.update_processing_status)
+    
+    def retry(self, job_id):
+        with self.condition:
+            for job in self.jobs:
+                if job.job_id == job_id and job.status in ("failed", "cancelled"):
+                    job.status = "queued"
+                    job.progress = 0.0
+                    job.error = None
+                    job.attempts = 0
+                    job.cancel_requested = False
+                    self.save_state()
+                    self.condition.notify()
+        self.recorder.root.after(0, self.recorder.update_processing_status)
+    
+    def remove(self, job_id):
+        """Drop a finished, failed or cancelled job, deleting the capture files it kept"""
+        with self.condition:
+            for job in self.jobs:
+                if job.job_id != job_id or job.status not in ("done", "failed", "cancelled"):
+                    continue
+                self.jobs.remove(job)
+                if job.status != "done":
+                    for filename in job.source_files():
+                        try:
+                            os.remove(filename)
+                        except OSError:
+                            pass
+                self.save_state()
+                break
+        self.recorder.root.after(0, self.recorder.update_processing_status)
+    
+    def set_trim(self, job_id, trim):
+        """Set the export range of a job that has not started yet"""
+        with self.condition:
+            for job in self.jobs:
+                if job.job_id == job_id and job.status in ("held", "queued", "failed", "cancelled"):
+                    job.trim = trim
+                    self.save_state()
+        self.recorder.root.after(0, self.recorder.update_processing_status)
+    
+    def wake(self):
+        """Let workers re-check deferred jobs"""
+        with self.condition:
+            self.condition.notify_all()
+    
+    def pending_count(self):
+        with self.condition:
+            return sum(1 for job in self.jobs if job.status in ("queued", "running"))
+    
+    def snapshot(self):
+        with self.condition:
+            return list(self.jobs)
+    
+    def next_job(self, index):
+        """Block until a queued job is available (None when stopping)"""
+        with self.condition:
+            while self.active and index < self.workers:
+                for job in self.jobs:
+                    # Raw captures are encoded once capture has the disk to itself
+                    if job.defer_while_recording and self.recorder.is_recording:
+                        continue
+                    if job.status == "queued":
+                        job.status = "running"
+                        job.attempts += 1
+                        self.save_state()
+                        return job
+                self.condition.wait()
+            # Deregister in the same critical section so spawn_workers can replace this index
+            del self.threads[index]
+            return None
+    
+    def worker(self, index):
+        while True:
+            job = self.next_job(index)
+            if job is None:
+                return
+            
+            self.recorder.root.after(0, self.recorder.update_processing_status)
+            logger = JobProgressLogger(job, lambda j: self.recorder.root.after(0, self.recorder.update_processing_status))
+            
+            try:
+                if self.recorder.run_processing_job(job, logger):
+                    status, error = "done", None
+                else:
+                    status, error = "failed", "Source files missing"
+            except JobCancelled:
+                status, error = "cancelled", None
+            except Exception as e:
+                print(f"Processing job {job.job_id} failed: {e}")
+                status, error = "failed", str(e)
+            
+            # Drop partial output so a retry starts clean
+            if status != "done":
+                for filename in job.output_files():
+                    if os.path.exists(filename):
+                        try:
+                            os.remove(filename)
+                        except:
+                            pass
+            
+            with self.condition:
+                job.cancel_requested = False
+                if status == "failed" and job.attempts < self.max_attempts:
+                    # Retry automatically before giving up
+                    job.status = "queued"
+                    job.progress = 0.0
+                else:
+                    job.status = status
+                    job.progress = 1.0 if status == "done" else job.progress
+                job.error = error
+                self.save_state()
+                self.condition.notify()
+            
+            self.recorder.root.after(0, lambda j=job: self.recorder.processing_finished(j))
+
+class ProcessingQueueWindow:
+    """Window listing post-processing jobs with their progress"""
+    def __init__(self, parent):
+        self.window = None
+        self.tree = None
+        self.parent = parent  # Reference to main app for the queue
+    
+    def create_window(self):
+        if self.window:
+            self.window.lift()
+            return
+        
+        self.window = tk.Toplevel(self.parent.root)
+        self.window.title("Processing Queue")
+        self.window.geometry("520x300")
+        self.window.protocol("WM_DELETE_WINDOW", self.close_window)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Job list
+        self.tree = ttk.Treeview(frame, columns=("file", "status", "progress"), show="headings", height=8)
+        self.tree.heading("file", text="Recording")
+        self.tree.heading("status", text="Status")
+        self.tree.heading("progress", text="Progress")
+        self.tree.column("file", width=280)
+        self.tree.column("status", width=90)
+        self.tree.column("progress", width=80, anchor=tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        
+        # Job actions
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(button_frame, text="Cancel", command=self.cancel_selected).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Retry", command=self.retry_selected).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(button_frame, text="Trim...", command=self.trim_selected).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(button_frame, text="Remove", command=self.remove_selected).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(button_frame, text="Export", command=self.export_selected).pack(side=tk.RIGHT)
+        
+        self.refresh()
+    
+    def refresh(self):
+        """Redraw the job list from the queue"""
+        if not self.window:
+            return
+        
+        selection = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for job in self.parent.processing_queue.snapshot():
+            status = job.status if not job.error else f"{job.status}: {job.error}"
+            self.tree.insert("", tk.END, iid=job.job_id,
+                             values=(os.path.basename(job.final_filename), status, f"{job.progress * 100:.0f}%"))
+        
+        # Keep the selection across refreshes
+        existing = [iid for iid in selection if self.tree.exists(iid)]
+        if existing:
+            self.tree.selection_set(existing)
+    
+    def cancel_selected(self):
+        for job_id in self.tree.selection():
+            self.parent.processing_queue.cancel(job_id)
+    
+    def export_selected(self):
+        for job_id in self.tree.selection():
+            self.parent.processing_queue.release(job_id)
+    
+    def retry_selected(self):
+        for job_id in self.tree.selection():
+            self.parent.processing_queue.retry(job_id)
+    
+    def remove_selected(self):
+        """Clear finished jobs from the list, failed and cancelled ones lose their capture files"""
+        jobs = [job for job in self.parent.processing_queue.snapshot()
+                if job.job_id in self.tree.selection() and job.status in ("done", "failed", "cancelled")]
+        if not jobs:
+            return
+        if any(job.status != "done" for job in jobs):
+            if not messagebox.askyesno("Remove", "Delete the unprocessed capture files of the selected "
+                                                 "jobs? They can't be retried afterwards.", parent=self.window):
+                return
+        for job in jobs:
+            self.parent.processing_queue.remove(job.job_id)
+    
+    def trim_selected(self):
+        """Ask for an export range for the selected job"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        start = simpledialog.askfloat("Trim", "Start at (seconds):", parent=self.window, minvalue=0.0)
+        if start is None:
+            return
+        end = simpledialog.askfloat("Trim", "End at (seconds, 0 for end of recording):",
+                                    parent=self.window, minvalue=0.0)
+        if end is None:
+            return
+        self.parent.processing_queue.set_trim(selection[0], [start, end if end > start else None])
+    
+    def close_window(self):
+        if self.window:
+            self.window.destroy()
+            self.window = None
+            self.tree = None
+
+def is_final_recording(filename):
+    """True for finished recordings, false for capture and mux temporaries"""
+    if not filename.endswith(".mp4") or filename.endswith("_proxy.mp4"):
+        return False
+    if filename.startswith("final_recording_"):
+        return True
+    return filename.startswith("replay_") and not filename.startswith("replay_video_")
+
+class RecordingsIndex:
+    """Incremental SQLite index of the recordings folder with cached thumbnails"""
+    def __init__(self, folder, on_change=None, poll_interval=2.0):
+        self.folder = folder
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.thumbnail_folder = os.path.join(folder, ".thumbnails")
+        self.lock = threading.Lock()
+        self.watch_active = False
+        self.watch_thread = None
+        
+        if not os.path.exists(self.thumbnail_folder):
+            os.makedirs(self.thumbnail_folder)
+        
+        self.db = sqlite3.connect(os.path.join(folder, ".recordings_index.db"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS recordings (
+                path TEXT PRIMARY KEY,
+                mtime REAL,
+                size INTEGER,
+                duration REAL,
+                width INTEGER,
+                height INTEGER,
+                fps REAL,
+                audio_device TEXT,
+                camera_device TEXT,
+                thumbnail TEXT,
+                preview_strip TEXT,
+                system_audio_device TEXT
+            )
+        """)
+        # Indexes created before system audio mixing lack its column
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(recordings)")]
+        if "system_audio_device" not in columns:
+            self.db.execute("ALTER TABLE recordings ADD COLUMN system_audio_device TEXT")
+        self.db.execute("CREATE INDEX IF NOT EXISTS recordings_mtime ON recordings (mtime)")
+        self.db.commit()
+    
+    def probe(self, path):
+        """Read video properties and cache a thumbnail and a preview strip"""
+        cap = cv2.VideoCapture(path)
+        try:
+            if not cap.isOpened():
+                return None
+            
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            duration = frame_count / fps if fps > 0 else 0.0
+            
+            # Grab a handful of evenly spaced frames, the first one doubles as thumbnail
+            strip_frames = []
+            for position in (0.1, 0.3, 0.5, 0.7, 0.9):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_count * position))
+                ret, frame = cap.read()
+                if ret:
+                    strip_frames.append(frame)
+            
+            key = hashlib.md5(path.encode("utf-8")).hexdigest()
+            thumbnail = None
+            preview_strip = None
+            if strip_frames:
+                thumbnail = os.path.join(self.thumbnail_folder, f"{key}.jpg")
+                cv2.imwrite(thumbnail, self.resize_to_width(strip_frames[0], 240))
                 
-                # Update canvas with better background handling
-                if self.canvas:
-                    self.canvas.delete("all")
-                    self.canvas.create_image(100, 100, image=photo)
-                    self.canvas.image = photo
+                preview_strip = os.path.join(self.thumbnail_folder, f"{key}_strip.jpg")
+                tiles = [self.resize_to_width(frame, 96) for frame in strip_frames]
+                tile_height = min(tile.shape[0] for tile in tiles)
+                cv2.imwrite(preview_strip, np.hstack([tile[:tile_height] for tile in tiles]))
             
-            if self.window:
-                self.window.after(30, self.update_video)
+            return {
+                'duration': duration,
+                'width': width,
+                'height': height,
+                'fps': fps,
+                'thumbnail': thumbnail,
+                'preview_strip': preview_strip
+            }
+        finally:
+            cap.release()
+    
+    def resize_to_width(self, frame, width):
+        height = max(1, int(frame.shape[0] * width / frame.shape[1]))
+        return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    
+    def add(self, path, devices=None, notify=True):
+        """Index (or re-index) a single recording, sync() batches the change notification"""
+        try:
+            stat = os.stat(path)
+            info = self.probe(path)
+            if info is None:
+                return
+            
+            devices = devices or {}
+            with self.lock:
+                # Keep device names from finalize time if the watcher re-indexes later
+                self.db.execute("""
+                    INSERT INTO recordings (path, mtime, size, duration, width, height, fps,
+                                            audio_device, camera_device, thumbnail, preview_strip,
+                                            system_audio_device)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        mtime = excluded.mtime, size = excluded.size, duration = excluded.duration,
+                        width = excluded.width, height = excluded.height, fps = excluded.fps,
+                        audio_device = COALESCE(excluded.audio_device, recordings.audio_device),
+                        camera_device = COALESCE(excluded.camera_device, recordings.camera_device),
+                        system_audio_device = COALESCE(excluded.system_audio_device,
+                                                       recordings.system_audio_device),
+                        thumbnail = excluded.thumbnail, preview_strip = excluded.preview_strip
+                """, (path, stat.st_mtime, stat.st_size, info['duration'], info['width'], info['height'],
+                      info['fps'], devices.get('audio'), devices.get('camera'),
+                      info['thumbnail'], info['preview_strip'], devices.get('system_audio')))
+                self.db.commit()
+            
+            if notify and self.on_change:
+                self.on_change()
+        except Exception as e:
+            print(f"Error indexing {path}: {e}")
+    
+    def remove(self, path):
+        """Drop a recording and its cached images from the index (caller holds the lock)"""
+        row = self.db.execute("SELECT thumbnail, preview_strip FROM recordings WHERE path = ?", (path,)).fetchone()
+        if row:
+            for cached in row:
+                if cached and os.path.exists(cached):
+                    try:
+                        os.remove(cached)
+                    except:
+                        pass
+        self.db.execute("DELETE FROM recordings WHERE path = ?", (path,))
+    
+    def sync(self):
+        """Bring the index up to date with the folder, only probing changed files"""
+        with self.lock:
+            known = {row[0]: (row[1], row[2]) for row in
+                     self.db.execute("SELECT path, mtime, size FROM recordings")}
+        
+        changed = []
+        present = set()
+        now = time.time()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not is_final_recording(entry.name):
+                    continue
+                stat = entry.stat()
+                # Skip files still being written by the encoder
+                if now - stat.st_mtime < 3:
+                    continue
+                present.add(entry.path)
+                if known.get(entry.path) != (stat.st_mtime, stat.st_size):
+                    changed.append(entry.path)
+        
+        removed = [path for path in known if path not in present and not os.path.exists(path)]
+        if removed:
+            with self.lock:
+                for path in removed:
+                    self.remove(path)
+                self.db.commit()
+        
+        for path in changed:
+            if not self.watch_active:
+                break
+            self.add(path, notify=False)
+        
+        # One refresh per pass, however many files changed
+        if (removed or changed) and self.on_change:
+            self.on_change()
+    
+    def start_watching(self):
+        """Keep the index in sync with the folder from a background thread"""
+        if not self.watch_active:
+            self.watch_active = True
+            self.watch_thread = threading.Thread(target=self.watch_worker)
+            self.watch_thread.daemon = True
+            self.watch_thread.start()
+    
+    def stop_watching(self):
+        self.watch_active = False
+    
+    def watch_worker(self):
+        while self.watch_active:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Recordings watcher error: {e}")
+            time.sleep(self.poll_interval)
+    
+    def query(self):
+        """All indexed recordings, newest first"""
+        with self.lock:
+            cursor = self.db.execute("""
+                SELECT path, mtime, size, duration, width, height, fps,
+                       audio_device, camera_device, thumbnail, preview_strip, system_audio_device
+                FROM recordings ORDER BY mtime DESC
+            """)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+class RecordingsBrowser:
+    """In-app browser for the recordings folder backed by the recordings index"""
+    def __init__(self, parent):
+        self.window = None
+        self.tree = None
+        self.rows = {}
+        self.thumbnail_photo = None
+        self.strip_photo = None
+        self.parent = parent  # Reference to main app for the index and opening files
+    
+    def create_window(self):
+        if self.window:
+            self.window.lift()
+            return
+        
+        self.window = tk.Toplevel(self.parent.root)
+        self.window.title("Recordings")
+        self.window.geometry("760x460")
+        self.window.protocol("WM_DELETE_WINDOW", self.close_window)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Recording list
+        list_frame = ttk.Frame(frame)
+        list_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.tree = ttk.Treeview(list_frame, columns=("name", "duration", "resolution", "size"),
+                                 show="headings", selectmode="browse")
+        self.tree.heading("name", text="Recording")
+        self.tree.heading("duration", text="Duration")
+        self.tree.heading("resolution", text="Resolution")
+        self.tree.heading("size", text="Size")
+        self.tree.column("name", width=220)
+        self.tree.column("duration", width=70, anchor=tk.E)
+        self.tree.column("resolution", width=90, anchor=tk.E)
+        self.tree.column("size", width=70, anchor=tk.E)
+        
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+        self.tree.bind('<Double-1>', lambda event: self.open_selected())
+        
+        # Details panel
+        detail_frame = ttk.Frame(frame, padding=(10, 0, 0, 0))
+        detail_frame.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.thumbnail_label = ttk.Label(detail_frame)
+        self.thumbnail_label.pack(pady=(0, 5))
+        self.strip_label = ttk.Label(detail_frame)
+        self.strip_label.pack(pady=(0, 5))
+        self.details_label = ttk.Label(detail_frame, text="", justify=tk.LEFT, font=("Arial", 9))
+        self.details_label.pack(anchor=tk.W, pady=(0, 10))
+        
+        ttk.Button(detail_frame, text="Open", command=self.open_selected).pack(fill=tk.X)
+        ttk.Button(detail_frame, text="Open Folder", 
+                   command=self.parent.open_recordings_folder).pack(fill=tk.X, pady=(5, 0))
+        
+        self.refresh()
+    
+    def refresh(self):
+        """Reload the list from the index"""
+        if not self.window:
+            return
+        
+        selection = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        self.rows = {}
+        for row in self.parent.recordings_index.query():
+            self.rows[row['path']] = row
+            minutes, seconds = divmod(int(row['duration'] or 0), 60)
+            self.tree.insert("", tk.END, iid=row['path'], values=(
+                os.path.basename(row['path']),
+                f"{minutes}:{seconds:02d}",
+                f"{row['width']}x{row['height']}",
+                f"{(row['size'] or 0) / (1024 * 1024):.1f} MB"
+            ))
+        
+        existing = [iid for iid in selection if self.tree.exists(iid)]
+        if existing:
+            self.tree.selection_set(existing)
+    
+    def on_select(self, event=None):
+        """Show cached thumbnail, preview strip and metadata of the selection"""
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.rows:
+            return
+        row = self.rows[selection[0]]
+        
+        self.thumbnail_photo = self.load_photo(row['thumbnail'])
+        self.strip_photo = self.load_photo(row['preview_strip'])
+        self.thumbnail_label.config(image=self.thumbnail_photo or "")
+        self.strip_label.config(image=self.strip_photo or "")
+        
+        details = [
+            f"Recorded: {datetime.fromtimestamp(row['mtime']).strftime('%Y-%m-%d %H:%M')}",
+            f"Frame rate: {row['fps'] or 0:.1f} fps",
+            f"Microphone: {row['audio_device'] or 'Unknown'}",
+            f"System audio: {row['system_audio_device'] or 'None'}",
+            f"Camera: {row['camera_device'] or 'Unknown'}"
+        ]
+        self.details_label.config(text="\n".join(details))
+    
+    def load_photo(self, path):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return ImageTk.PhotoImage(Image.open(path))
+        except Exception as e:
+            print(f"Error loading thumbnail: {e}")
+            return None
+    
+    def open_selected(self):
+        selection = self.tree.selection()
+        if selection:
+            self.parent.open_path(selection[0])
     
     def close_window(self):
-        self.is_running = False
-        if self.cap:
-            self.cap.release()
         if self.window:
             self.window.destroy()
             self.window = None
+            self.tree = None
+            self.thumbnail_photo = None
+            self.strip_photo = None
 
 class ScreenRecorder:
+    # Device name fragments that identify loopback ("what you hear") inputs
+    LOOPBACK_KEYWORDS = ("monitor", "loopback", "stereo mix", "what u hear", "wave out")
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Just Record It")
-        self.root.geometry("450x800")  # Increased height for better spacing
+        self.root.geometry("450x1000")  # Increased height for better spacing
         self.root.resizable(False, False)
         
+        # Settings file with performance profiles
+        self.settings = Settings(os.path.join(os.path.expanduser("~"), ".just_record_it.json"))
+        
         # Recording variables
         self.is_recording = False
-        self.output_folder = os.path.join(os.path.expanduser("~"), "Desktop", "recordings")
+        self.is_paused = False
+        self.output_folder = self.settings.get('output_folder')  # Applied at startup only
         self.current_filename = None
         self.audio_filename = None
+        self.video_fps = 15.0  # Reduced FPS for more stable recording
+        self.capture_scale = 1.0
+        self.raw_capture = False  # Capture now, encode later
+        self.proxy_enabled = False  # Low-bitrate copy encoded alongside the archive
+        self.proxy_scale = 0.5
+        self.proxy_filename = None
+        
+        # Idle segment detection
+        self.idle_detector = IdleDetector()
+        self.idle_speed = 8.0  # Speed-up factor for idle segments
+        self.video_activity = []  # (timestamp, changed fraction) per frame
+        self.audio_levels = []    # (timestamp, dB) per audio chunk
+        
+        # Shared clock for A/V sync
+        self.sync_clock = SyncClock()
+        self.sync_info = None
+        
+        # Cursor, clicks and keys recorded as data instead of burned into the frames
+        self.input_recorder = InputEventRecorder(self)
+        self.input_events = True  # Clicks on the track as well as the cursor
+        self.record_keys = False  # Key press times, opt-in
+        self.events_filename = None
         
         # Audio recording settings
         self.audio_format = pyaudio.paInt16
         self.audio_channels = 2
-        self.audio_rate = 44100
+        self.audio_rate = 44100  # Overridden by apply_settings
+        self.audio_capture_rate = 44100  # Rate negotiated with the device
         self.audio_chunk = 1024
+        self.audio_codec = "wav"
         self.audio_frames = []
         self.audio_thread = None
+        self.session = None  # Per-session state handed from the capture threads to the queue
         
         # Audio monitoring
         self.audio_monitor_active = False
@@ -186,6 +2165,8 @@ class ScreenRecorder:
         self.preview_cap = None
         self.preview_active = False
         self.preview_canvas = None
+        self.preview_renderer = None
+        self.display_refresh_rate = get_display_refresh_rate()
         
         # Device lists
         self.audio_devices = []
@@ -194,14 +2175,31 @@ class ScreenRecorder:
         # Self view window
         self.self_view = SelfViewWindow(self)
         
+        # Instant replay
+        self.replay_seconds = 60
+        self.replay_buffer = ReplayBuffer(self, seconds=self.replay_seconds)
+        
         # Load cursor image
         self.cursor_image = None
-        self.load_cursor_image()
+        self.cursor_size = None
+        
+        # Pull tuning values from the settings file
+        self.apply_settings()
         
         # Create output folder
         if not os.path.exists(self.output_folder):
             os.makedirs(self.output_folder)
         
+        # Background post-processing
+        self.processing_queue = ProcessingQueue(self, os.path.join(self.output_folder, ".processing_queue.json"),
+                                                workers=self.settings.get('processing_workers'))
+        self.processing_window = ProcessingQueueWindow(self)
+        
+        # Recordings index and browser
+        self.recordings_index = RecordingsIndex(self.output_folder,
+                                                on_change=lambda: self.root.after(0, self.recordings_browser.refresh))
+        self.recordings_browser = RecordingsBrowser(self)
+        
         # Enumerate devices
         self.enumerate_devices()
         
@@ -210,6 +2208,119 @@ class ScreenRecorder:
         # Start audio monitoring and camera preview
         self.start_audio_monitoring()
         self.start_camera_preview()
+        
+        # Resume any jobs left over from a previous run
+        self.processing_queue.start()
+        self.update_processing_status()
+        
+        # Pick up recordings added or removed outside the app
+        self.recordings_index.start_watching()
+    
+    def apply_settings(self):
+        """Copy the current settings onto the recorder (between sessions only)"""
+        settings = self.settings
+        previous_audio = (self.audio_rate, self.audio_chunk)
+        
+        self.video_fps = min(120.0, max(1.0, settings.get('video_fps')))
+        self.capture_scale = min(1.0, max(0.1, settings.get('capture_scale')))
+        self.raw_capture = settings.get('raw_capture')
+        self.proxy_enabled = settings.get('proxy_enabled')
+        self.proxy_scale = min(1.0, max(0.1, settings.get('proxy_scale')))
+        self.audio_rate = min(192000, max(8000, settings.get('audio_rate')))
+        self.audio_channels = min(2, max(1, settings.get('audio_channels')))
+        self.audio_chunk = min(16384, max(64, settings.get('audio_chunk')))
+        self.audio_codec = settings.get('audio_codec')
+        if self.audio_codec not in AudioEncoder.CODECS and self.audio_codec != "wav":
+            print(f"Unknown audio codec '{self.audio_codec}', using wav")
+            self.audio_codec = "wav"
+        
+        self.replay_seconds = max(1, settings.get('replay_seconds'))
+        self.replay_buffer.seconds = self.replay_seconds
+        self.replay_buffer.fps = min(60.0, max(0.5, settings.get('replay_fps')))  # Used from the next buffer start
+        
+        self.idle_speed = max(1.0, settings.get('idle_speed'))
+        self.idle_detector.min_idle = max(0.0, settings.get('idle_min_seconds'))
+        self.idle_detector.silence_db = settings.get('idle_silence_db')
+        
+        self.mic_gain = max(0.0, settings.get('mic_gain'))
+        self.system_audio_gain = max(0.0, settings.get('system_audio_gain'))
+        self.limiter_threshold = min(1.0, max(0.1, settings.get('limiter_threshold')))
+        
+        self.input_events = settings.get('input_events')
+        self.record_keys = settings.get('record_keys')
+        self.input_recorder.poll_hz = max(1.0, settings.get('input_poll_hz'))
+        
+        if settings.get('cursor_size') != self.cursor_size:
+            self.load_cursor_image()
+        
+        # Only touch things that exist once the app is fully set up
+        if hasattr(self, 'processing_queue'):
+            self.processing_queue.set_workers(settings.get('processing_workers'))
+        if hasattr(self, 'record_btn'):
+            self.raw_capture_var.set(self.raw_capture)
+            self.proxy_var.set(self.proxy_enabled)
+            self.profile_var.set(settings.profile)
+            self.save_replay_btn.config(text=f"Save Last {self.replay_seconds}s")
+            if (self.audio_rate, self.audio_chunk) != previous_audio:
+                self.restart_audio_monitoring()
+    
+    def reload_settings(self):
+        """Live reload of the settings file between sessions"""
+        if self.settings.reload_if_changed():
+            print("Settings file changed, reloading")
+            self.apply_settings()
+    
+    def set_setting_override(self, key, value):
+        """Remember a choice made in the UI in the settings file"""
+        self.settings.overrides[key] = value
+        self.settings.save()
+        self.settings.resolve()
+    
+    def on_raw_capture_change(self):
+        self.set_setting_override('raw_capture', self.raw_capture_var.get())
+        self.raw_capture = self.settings.get('raw_capture')
+    
+    def on_proxy_change(self):
+        self.set_setting_override('proxy_enabled', self.proxy_var.get())
+        self.proxy_enabled = self.settings.get('proxy_enabled')
+    
+    def on_profile_change(self, event=None):
+        """Switch to the performance profile picked in the dropdown"""
+        self.settings.set_profile(self.profile_var.get())
+        self.apply_settings()
+        self.status_label.config(text=f"Profile: {self.settings.profile}")
+    
+    def start_auto_tune(self):
+        """Run a short calibration capture and store the result as the 'auto' profile"""
+        if self.is_recording:
+            return
+        self.set_ui_controls_enabled(False)
+        self.status_label.config(text="Calibrating...")
+        
+        tune_thread = threading.Thread(target=self.auto_tune_worker)
+        tune_thread.daemon = True
+        tune_thread.start()
+    
+    def auto_tune_worker(self):
+        try:
+            temp_filename = os.path.join(self.output_folder, "calibration.mp4")
+            result = AutoTuner().run(temp_filename)
+            self.root.after(0, lambda: self.auto_tune_finished(result))
+        except Exception as e:
+            print(f"Auto-tune failed: {e}")
+            self.root.after(0, lambda: self.auto_tune_finished(None))
+    
+    def auto_tune_finished(self, result):
+        self.set_ui_controls_enabled(True)
+        if not result:
+            self.status_label.config(text="Calibration failed")
+            return
+        
+        self.settings.set_profile("auto", result)
+        self.profile_dropdown.config(values=self.settings.profile_names())
+        self.apply_settings()
+        self.status_label.config(text=f"Auto-tuned: {result['video_fps']:.0f} fps at "
+                                      f"{result['capture_scale'] * 100:.0f}% resolution")
     
     def load_cursor_image(self):
         """Load the cursor PNG image for overlay"""
@@ -219,8 +2330,9 @@ class ScreenRecorder:
                 # Load image with PIL to handle transparency
                 pil_image = Image.open(cursor_path).convert("RGBA")
                 
-                # Resize cursor to appropriate size (24x24 pixels - typical cursor size)
-                cursor_size = (40, 40)
+                # Resize cursor to the configured size
+                self.cursor_size = self.settings.get('cursor_size')
+                cursor_size = (self.cursor_size, self.cursor_size)
                 pil_image = pil_image.resize(cursor_size, Image.Resampling.LANCZOS)
                 
                 # Convert PIL image to OpenCV format
@@ -233,16 +2345,18 @@ class ScreenRecorder:
             print(f"Error loading cursor image: {e}")
             self.cursor_image = None
     
-    def overlay_cursor(self, frame, cursor_x, cursor_y):
-        """Overlay cursor PNG image on the frame"""
-        if self.cursor_image is None:
+    def overlay_cursor(self, frame, cursor_x, cursor_y, cursor_image=None):
+        """Overlay cursor PNG image (or a given image in the frame's channel order) on the frame"""
+        if cursor_image is None:
+            cursor_image = self.cursor_image
+        if cursor_image is None:
             # Fallback to drawing circles
             cv2.circle(frame, (cursor_x, cursor_y), 8, (255, 255, 255), 2)  # White circle
             cv2.circle(frame, (cursor_x, cursor_y), 6, (0, 0, 0), 2)        # Black inner circle
             cv2.circle(frame, (cursor_x, cursor_y), 2, (255, 255, 255), -1) # White center dot
             return
         
-        cursor_h, cursor_w = self.cursor_image.shape[:2]
+        cursor_h, cursor_w = cursor_image.shape[:2]
         
         # Calculate position to center cursor on click point (adjust for cursor hotspot)
         # Most cursors have their hotspot at the top-left, so we don't offset
@@ -272,7 +2386,7 @@ class ScreenRecorder:
         
         # Get the region of the frame where cursor will be placed
         frame_region = frame[start_y:end_y, start_x:end_x]
-        cursor_region = self.cursor_image[cursor_start_y:cursor_end_y, cursor_start_x:cursor_end_x]
+        cursor_region = cursor_image[cursor_start_y:cursor_end_y, cursor_start_x:cursor_end_x]
         
         if frame_region.shape[0] > 0 and frame_region.shape[1] > 0 and cursor_region.shape[0] > 0 and cursor_region.shape[1] > 0:
             # Extract alpha channel for blending
@@ -292,22 +2406,39 @@ class ScreenRecorder:
         try:
             audio = pyaudio.PyAudio()
             self.audio_devices = []
+            self.system_audio_devices = [{"name": "None", "index": None}]
             
             # Add system default first
             self.audio_devices.append({"name": "System Default", "index": None})
             
+            loopback_devices = []
             for i in range(audio.get_device_count()):
                 device_info = audio.get_device_info_by_index(i)
+                if device_info['maxInputChannels'] <= 0:
+                    continue
+                # Loopback capture shows up as an input device (PulseAudio monitors, Stereo Mix, ...)
+                name = device_info['name']
+                if any(keyword in name.lower() for keyword in self.LOOPBACK_KEYWORDS):
+                    loopback_devices.append((device_info['hostApi'], name, i))
                 # Filter for input devices using primary host API only to avoid duplicates
-                if device_info['maxInputChannels'] > 0 and device_info['hostApi'] == 0:
+                if device_info['hostApi'] == 0:
                     self.audio_devices.append({
-                        "name": device_info['name'],
+                        "name": name,
                         "index": i
                     })
             audio.terminate()
+            
+            # Same rule for loopback devices, other host APIs only when the primary one has none
+            primary = [device for device in loopback_devices if device[0] == 0]
+            seen = set()
+            for host_api, name, index in primary or loopback_devices:
+                if name not in seen:
+                    seen.add(name)
+                    self.system_audio_devices.append({"name": name, "index": index})
         except Exception as e:
             print(f"Error enumerating audio devices: {e}")
             self.audio_devices = [{"name": "System Default", "index": None}]
+            self.system_audio_devices = [{"name": "None", "index": None}]
         
         # Enumerate camera devices
         self.camera_devices = []
@@ -340,6 +2471,17 @@ class ScreenRecorder:
             pass
         return None  # System default
     
+    def get_selected_system_audio_index(self):
+        """Get the index of the selected system audio (loopback) device, None when disabled"""
+        try:
+            selection = self.system_audio_var.get()
+            for device in self.system_audio_devices:
+                if device["name"] == selection:
+                    return device["index"]
+        except:
+            pass
+        return None
+    
     def get_selected_camera_index(self):
         """Get the index of the selected camera device"""
         try:
@@ -386,6 +2528,8 @@ class ScreenRecorder:
         # Clear the preview canvas
         if self.preview_canvas:
             self.preview_canvas.delete("all")
+            self.preview_renderer.report("Camera preview")
+            self.preview_renderer.reset()
             self.preview_canvas.create_text(160, 120, text="Camera Preview Disabled\n(Self View Active)", 
                                           fill="white", font=("Arial", 12), justify=tk.CENTER)
     
@@ -398,8 +2542,14 @@ class ScreenRecorder:
     def update_camera_preview(self):
         """Update camera preview display"""
         if self.preview_active and self.preview_cap and self.preview_cap.isOpened() and self.preview_canvas:
-            ret, frame = self.preview_cap.read()
-            if ret:
+            started = time.perf_counter()
+            
+            # Don't read or convert anything while the window is minimized
+            ret = False
+            if self.preview_renderer.is_visible():
+                ret, frame = self.preview_cap.read()
+            
+            if ret and not self.preview_renderer.is_unchanged(frame):
                 # Flip frame horizontally for mirror effect
                 frame = cv2.flip(frame, 1)
                 
@@ -412,17 +2562,13 @@ class ScreenRecorder:
                 # Convert to PIL Image
                 img = Image.fromarray(frame_rgb)
                 
-                # Convert to PhotoImage
-                photo = ImageTk.PhotoImage(img)
-                
-                # Update canvas
-                self.preview_canvas.delete("all")
-                self.preview_canvas.create_image(160, 120, image=photo)
-                self.preview_canvas.image = photo
+                # Paste into the existing image item
+                self.preview_renderer.draw(img)
             
             # Schedule next update
             if self.preview_active:
-                self.root.after(30, self.update_camera_preview)
+                delay = self.preview_renderer.next_delay(self.settings.get('preview_interval_ms'), started)
+                self.root.after(delay, self.update_camera_preview)
     
     def calculate_audio_level(self, audio_data):
         """Calculate audio level in decibels"""
@@ -447,6 +2593,33 @@ class ScreenRecorder:
             print(f"Error calculating audio level: {e}")
             return -60
     
+    def negotiate_audio_format(self, audio, device_index, channels):
+        """Pick a rate and channel count the device supports natively"""
+        try:
+            if device_index is None:
+                info = audio.get_default_input_device_info()
+            else:
+                info = audio.get_device_info_by_index(device_index)
+        except Exception as e:
+            print(f"Could not query audio device: {e}")
+            return self.audio_rate, channels
+        
+        native_rate = int(info['defaultSampleRate'])
+        max_channels = max(1, int(info['maxInputChannels']))
+        channels = min(channels, max_channels)
+        
+        # Prefer the device's own format so the driver doesn't convert
+        candidates = [(native_rate, channels), (self.audio_rate, channels), (native_rate, max_channels)]
+        for rate, candidate_channels in candidates:
+            try:
+                if audio.is_format_supported(rate, input_device=info['index'],
+                                             input_channels=candidate_channels,
+                                             input_format=self.audio_format):
+                    return rate, candidate_channels
+            except ValueError:
+                continue
+        return native_rate, channels
+    
     def audio_monitor_worker(self):
         """Worker thread for monitoring audio levels"""
         audio = None
@@ -460,11 +2633,15 @@ class ScreenRecorder:
                     # Get selected audio device
                     audio_device_index = self.get_selected_audio_device_index()
                     
+                    # Use mono for monitoring, at whatever rate the device runs natively
+                    rate, channels = self.negotiate_audio_format(audio, audio_device_index, 1)
+                    replay_converter = AudioConverter(rate, channels, self.audio_rate, 1)
+                    
                     # Setup stream parameters
                     stream_kwargs = {
                         'format': self.audio_format,
-                        'channels': 1,  # Use mono for monitoring
-                        'rate': self.audio_rate,
+                        'channels': channels,
+                        'rate': rate,
                         'input': True,
                         'frames_per_buffer': self.audio_chunk
                     }
@@ -481,6 +2658,10 @@ class ScreenRecorder:
                             data = stream.read(self.audio_chunk, exception_on_overflow=False)
                             level_db = self.calculate_audio_level(data)
                             
+                            # Feed the instant replay history
+                            if self.replay_buffer.active:
+                                self.replay_buffer.add_audio(replay_converter.convert(data))
+                            
                             # Update current level
                             self.current_audio_level = level_db
                             
@@ -581,13 +2762,21 @@ class ScreenRecorder:
         self.audio_dropdown.grid(row=0, column=1, padx=(10, 0), pady=5, sticky=tk.EW)
         self.audio_dropdown.bind('<<ComboboxSelected>>', self.on_audio_change)
         
+        # System audio (loopback) mixed with the microphone
+        ttk.Label(device_frame, text="System Audio:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.system_audio_var = tk.StringVar(value="None")
+        self.system_audio_dropdown = ttk.Combobox(device_frame, textvariable=self.system_audio_var,
+                                            values=[device["name"] for device in self.system_audio_devices],
+                                            state="readonly", width=30)
+        self.system_audio_dropdown.grid(row=1, column=1, padx=(10, 0), pady=5, sticky=tk.EW)
+        
         # Camera device selection
-        ttk.Label(device_frame, text="Camera:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        ttk.Label(device_frame, text="Camera:").grid(row=2, column=0, sticky=tk.W, pady=5)
         self.camera_var = tk.StringVar(value="System Default")
         self.camera_dropdown = ttk.Combobox(device_frame, textvariable=self.camera_var,
                                       values=[device["name"] for device in self.camera_devices],
                                       state="readonly", width=30)
-        self.camera_dropdown.grid(row=1, column=1, padx=(10, 0), pady=5, sticky=tk.EW)
+        self.camera_dropdown.grid(row=2, column=1, padx=(10, 0), pady=5, sticky=tk.EW)
         self.camera_dropdown.bind('<<ComboboxSelected>>', self.on_camera_change)
         
         # Configure device frame grid
@@ -600,6 +2789,8 @@ class ScreenRecorder:
         # Camera preview canvas
         self.preview_canvas = tk.Canvas(preview_frame, width=320, height=240, bg='black')
         self.preview_canvas.grid(row=0, column=0, pady=5)
+        self.preview_renderer = PreviewRenderer(self.preview_canvas, 320, 240,
+                                                refresh_rate=self.display_refresh_rate)
         
         # Configure preview frame grid
         preview_frame.columnconfigure(0, weight=1)
@@ -631,29 +2822,98 @@ class ScreenRecorder:
         self.record_btn = ttk.Button(main_frame, text="Start Recording", 
                                    command=self.toggle_recording,
                                    style="Accent.TButton")
-        self.record_btn.grid(row=4, column=0, columnspan=2, pady=10, sticky=tk.EW)
+        self.record_btn.grid(row=4, column=0, pady=10, padx=(0, 5), sticky=tk.EW)
+        
+        # Pause button (only active while recording)
+        self.pause_btn = ttk.Button(main_frame, text="Pause", 
+                                  command=self.toggle_pause, state="disabled")
+        self.pause_btn.grid(row=4, column=1, pady=10, padx=(5, 0), sticky=tk.EW)
         
         # See recordings button
         self.recordings_btn = ttk.Button(main_frame, text="See Recordings", 
-                                  command=self.open_recordings_folder)
-        self.recordings_btn.grid(row=5, column=0, columnspan=2, pady=5, sticky=tk.EW)
+                                  command=self.recordings_browser.create_window)
+        self.recordings_btn.grid(row=5, column=0, pady=5, padx=(0, 5), sticky=tk.EW)
+        
+        # Processing queue button
+        self.processing_btn = ttk.Button(main_frame, text="Processing Queue", 
+                                       command=self.processing_window.create_window)
+        self.processing_btn.grid(row=5, column=1, pady=5, padx=(5, 0), sticky=tk.EW)
         
         # Self view toggle
         self.self_view_var = tk.BooleanVar()
         self.self_view_check = ttk.Checkbutton(main_frame, text="Self View", 
                                         variable=self.self_view_var,
                                         command=self.toggle_self_view)
-        self.self_view_check.grid(row=6, column=0, columnspan=2, pady=10)
+        self.self_view_check.grid(row=6, column=0, pady=10)
+        
+        # Capture now, encode later toggle
+        self.raw_capture_var = tk.BooleanVar(value=self.raw_capture)
+        self.raw_capture_check = ttk.Checkbutton(main_frame, text="Lossless raw capture", 
+                                               variable=self.raw_capture_var,
+                                               command=self.on_raw_capture_change)
+        self.raw_capture_check.grid(row=6, column=1, pady=10)
+        
+        # Idle segment handling at export
+        ttk.Label(main_frame, text="Idle parts:").grid(row=7, column=0, sticky=tk.W, pady=(0, 10))
+        self.idle_mode_var = tk.StringVar(value="Keep")
+        self.idle_mode_dropdown = ttk.Combobox(main_frame, textvariable=self.idle_mode_var,
+                                             values=["Keep", "Cut", "Speed up"],
+                                             state="readonly", width=15)
+        self.idle_mode_dropdown.grid(row=7, column=1, sticky=tk.EW, pady=(0, 10))
+        
+        # Performance profile frame
+        profile_frame = ttk.LabelFrame(main_frame, text="Performance", padding="10")
+        profile_frame.grid(row=8, column=0, columnspan=2, pady=(0, 10), sticky=tk.EW)
+        
+        ttk.Label(profile_frame, text="Profile:").grid(row=0, column=0, sticky=tk.W)
+        self.profile_var = tk.StringVar(value=self.settings.profile)
+        self.profile_dropdown = ttk.Combobox(profile_frame, textvariable=self.profile_var,
+                                           values=self.settings.profile_names(),
+                                           state="readonly", width=14)
+        self.profile_dropdown.grid(row=0, column=1, padx=(10, 0), sticky=tk.EW)
+        self.profile_dropdown.bind('<<ComboboxSelected>>', self.on_profile_change)
+        
+        self.auto_tune_btn = ttk.Button(profile_frame, text="Auto-tune", command=self.start_auto_tune)
+        self.auto_tune_btn.grid(row=0, column=2, padx=(10, 0))
+        
+        self.edit_settings_btn = ttk.Button(profile_frame, text="Edit...", 
+                                          command=lambda: self.open_path(self.settings.filename))
+        self.edit_settings_btn.grid(row=0, column=3, padx=(5, 0))
+        
+        # Web copy encoded next to the full quality archive
+        self.proxy_var = tk.BooleanVar(value=self.proxy_enabled)
+        self.proxy_check = ttk.Checkbutton(profile_frame, text="Also save a low-bitrate proxy", 
+                                         variable=self.proxy_var,
+                                         command=self.on_proxy_change)
+        self.proxy_check.grid(row=1, column=0, columnspan=4, sticky=tk.W, pady=(5, 0))
+        
+        profile_frame.columnconfigure(1, weight=1)
+        
+        # Instant replay frame
+        replay_frame = ttk.LabelFrame(main_frame, text="Instant Replay", padding="10")
+        replay_frame.grid(row=9, column=0, columnspan=2, pady=(0, 10), sticky=tk.EW)
+        
+        self.replay_var = tk.BooleanVar()
+        self.replay_check = ttk.Checkbutton(replay_frame, text="Keep replay buffer", 
+                                          variable=self.replay_var,
+                                          command=self.toggle_replay_buffer)
+        self.replay_check.grid(row=0, column=0, sticky=tk.W)
+        
+        self.save_replay_btn = ttk.Button(replay_frame, text=f"Save Last {self.replay_seconds}s", 
+                                        command=self.save_replay, state="disabled")
+        self.save_replay_btn.grid(row=0, column=1, sticky=tk.E)
+        
+        replay_frame.columnconfigure(1, weight=1)
         
         # Status label
         self.status_label = ttk.Label(main_frame, text="Ready to record", 
                                     font=("Arial", 10))
-        self.status_label.grid(row=7, column=0, columnspan=2, pady=20)
+        self.status_label.grid(row=10, column=0, columnspan=2, pady=20)
         
         # Recording info
         self.info_label = ttk.Label(main_frame, text="", 
                                    font=("Arial", 8), foreground="gray")
-        self.info_label.grid(row=8, column=0, columnspan=2, pady=5)
+        self.info_label.grid(row=11, column=0, columnspan=2, pady=5)
         
         # Configure grid weights
         main_frame.columnconfigure(0, weight=1)
@@ -669,9 +2929,18 @@ class ScreenRecorder:
         self.record_btn.config(state=state)
         self.recordings_btn.config(state=state)
         self.self_view_check.config(state=state)
+        self.replay_check.config(state=state)
+        self.raw_capture_check.config(state=state)
+        self.proxy_check.config(state=state)
+        self.auto_tune_btn.config(state=state)
+        self.edit_settings_btn.config(state=state)
+        self.profile_dropdown.config(state=readonly_state)
+        self.idle_mode_dropdown.config(state=readonly_state)
+        self.save_replay_btn.config(state=state if self.replay_var.get() else "disabled")
         
         # Disable/enable dropdowns
         self.audio_dropdown.config(state=readonly_state)
+        self.system_audio_dropdown.config(state=readonly_state)
         self.camera_dropdown.config(state=readonly_state)
     
     def toggle_recording(self):
@@ -682,80 +2951,169 @@ class ScreenRecorder:
     
     def start_recording(self):
         try:
+            # Pick up settings edited since the last session
+            self.reload_settings()
+            
             # Generate filename with timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.current_filename = os.path.join(self.output_folder, f"recording_{timestamp}.mp4")
-            self.audio_filename = os.path.join(self.output_folder, f"audio_{timestamp}.wav")
+            self.raw_capture = self.raw_capture_var.get()
+            extension = "raw" if self.raw_capture else "mp4"
+            self.current_filename = os.path.join(self.output_folder, f"recording_{timestamp}.{extension}")
+            self.audio_filename = os.path.join(self.output_folder,
+                                               f"audio_{timestamp}{AudioEncoder.extension(self.audio_codec)}")
+            
+            # Raw captures derive their proxy from the raw frames at export
+            self.proxy_filename = None
+            if self.proxy_enabled and not self.raw_capture:
+                self.proxy_filename = os.path.join(self.output_folder, f"proxy_{timestamp}.mp4")
             
             # Get screen dimensions
             screen_width, screen_height = pyautogui.size()
             
-            # Clear previous audio frames
+            # Input events are stamped on the session clock, in screen coordinates
+            self.events_filename = os.path.join(self.output_folder, f"input_{timestamp}.events")
+            
+            # Clear previous audio frames and activity statistics
             self.audio_frames = []
+            self.video_activity = []
+            self.audio_levels = []
+            
+            # Everything the hand-off to the processing queue needs, owned by this session's threads
+            self.session = {
+                'video_filename': self.current_filename,
+                'audio_filename': self.audio_filename,
+                'proxy_filename': self.proxy_filename,
+                'events_filename': self.events_filename,
+                'audio_frames': self.audio_frames,
+                'video_activity': self.video_activity,
+                'audio_levels': self.audio_levels,
+                'audio_capture_rate': self.audio_rate,  # Replaced by the negotiated rate
+                'audio_thread': None,
+                'video_fps': self.video_fps,
+                'proxy_scale': self.proxy_scale if self.proxy_enabled else None,
+                'idle_mode': "keep",  # Read from the UI when the session stops
+                'devices': {
+                    'audio': self.audio_var.get(),
+                    'system_audio': self.system_audio_var.get() if self.get_selected_system_audio_index() is not None else None,
+                    'camera': self.camera_var.get() if self.self_view_var.get() else None
+                }
+            }
+            
+            # Both capture threads stamp against the same clock
+            self.sync_clock.start()
+            self.sync_info = None
+            with mss.mss() as sct:
+                monitor = sct.monitors[1]  # Primary monitor, as captured by record_screen
+            self.input_recorder.start(self.events_filename, (monitor['width'], monitor['height']),
+                                      clicks=self.input_events, keys=self.record_keys)
             
             # Update UI
             self.is_recording = True
+            self.is_paused = False
             self.record_btn.config(text="Stop Recording")
+            self.pause_btn.config(text="Pause", state="normal")
+            self.raw_capture_check.config(state="disabled")
+            self.proxy_check.config(state="disabled")
+            self.profile_dropdown.config(state="disabled")
+            self.auto_tune_btn.config(state="disabled")
             self.status_label.config(text="Recording...")
             self.info_label.config(text=f"Output: {self.current_filename}")
             
             # Start audio recording in separate thread
-            self.audio_thread = threading.Thread(target=self.record_audio)
+            self.audio_thread = threading.Thread(target=self.record_audio, args=(self.session,))
             self.audio_thread.daemon = True
+            self.session['audio_thread'] = self.audio_thread
             self.audio_thread.start()
             
             # Start video recording in separate thread
-            self.recording_thread = threading.Thread(target=self.record_screen)
+            self.recording_thread = threading.Thread(target=self.record_screen, args=(self.session,))
             self.recording_thread.daemon = True
             self.recording_thread.start()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start recording: {str(e)}")
             self.is_recording = False
+            self.input_recorder.stop()
     
-    def record_screen(self):
+    def record_screen(self, session):
         try:
-            # Get screen dimensions
-            screen_width, screen_height = pyautogui.size()
-            
-            # Define codec and create VideoWriter
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            fps = 15.0  # Reduced FPS for more stable recording
-            
-            out = cv2.VideoWriter(self.current_filename, fourcc, fps, 
-                                (screen_width, screen_height))
+            fps = self.video_fps
+            out = None
+            proxy_out = None
+            raw_writer = None
             
             # Create MSS instance for faster screen capture
             with mss.mss() as sct:
                 monitor = sct.monitors[1]  # Primary monitor
                 
+                # Get output dimensions, downscaled by the active profile (kept even for the encoder)
+                screen_size = (monitor['width'], monitor['height'])
+                if self.capture_scale < 1.0:
+                    capture_size = (int(screen_size[0] * self.capture_scale) // 2 * 2,
+                                    int(screen_size[1] * self.capture_scale) // 2 * 2)
+                else:
+                    capture_size = screen_size
+                scaled = capture_size != screen_size
+                
+                if self.raw_capture:
+                    # Frames go straight into a memory-mapped file, encoding happens later
+                    raw_writer = RawFrameWriter(self.current_filename, capture_size[0], capture_size[1])
+                else:
+                    # Define codec and create VideoWriter
+                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                    out = cv2.VideoWriter(self.current_filename, fourcc, fps, capture_size)
+                
+                # Second encoder fed from the same grabbed frame
+                if self.proxy_filename:
+                    proxy_size = (int(capture_size[0] * self.proxy_scale) // 2 * 2,
+                                  int(capture_size[1] * self.proxy_scale) // 2 * 2)
+                    proxy_out = cv2.VideoWriter(self.proxy_filename, cv2.VideoWriter_fourcc(*'mp4v'),
+                                                fps, proxy_size)
+                
                 # Track timing for consistent frame rate
                 frame_time = 1.0 / fps
-                last_time = time.time()
+                last_time = -frame_time
+                previous_small = None  # Decimated previous frame for idle detection
                 
                 while self.is_recording:
-                    current_time = time.time()
+                    # Keep the capture context and writer open while paused
+                    if self.is_paused:
+                        time.sleep(0.01)
+                        continue
+                    
+                    current_time = self.sync_clock.now()
                     
                     # Only capture if enough time has passed
                     if current_time - last_time >= frame_time:
                         # Capture screen
                         screenshot = sct.grab(monitor)
                         
-                        # Convert to numpy array
-                        frame = np.array(screenshot)
+                        if raw_writer and not scaled:
+                            # Convert BGRA to BGR directly into the mapped frame slot
+                            frame = raw_writer.next_frame()
+                            cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_BGRA2BGR, dst=frame)
+                        else:
+                            # Convert BGRA to BGR
+                            frame = cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_BGRA2BGR)
                         
-                        # Convert BGRA to BGR
-                        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+                        # The cursor is recorded on its own event track and composited at export
+                        if scaled:
+                            target = raw_writer.next_frame() if raw_writer else None
+                            frame = cv2.resize(frame, capture_size, dst=target, interpolation=cv2.INTER_AREA)
                         
-                        # Get cursor position and draw it on the frame
-                        try:
-                            cursor_x, cursor_y = pyautogui.position()
-                            self.overlay_cursor(frame, cursor_x, cursor_y)
-                        except:
-                            pass  # Skip if cursor position can't be obtained
+                        # Cheap change statistic on a decimated copy for idle detection
+                        previous_small, change = self.idle_detector.measure_change(frame, previous_small)
+                        session['video_activity'].append((current_time, change))
                         
-                        # Write frame
-                        out.write(frame)
+                        # Write frame and stamp it on the shared clock
+                        if raw_writer:
+                            raw_writer.commit(current_time)
+                            frame = None  # Release the mapped view so the file can grow
+                        else:
+                            out.write(frame)
+                            if proxy_out:
+                                proxy_out.write(cv2.resize(frame, proxy_size, interpolation=cv2.INTER_AREA))
+                        self.sync_clock.mark_video_frame(current_time)
                         
                         last_time = current_time
                     else:
@@ -763,7 +3121,15 @@ class ScreenRecorder:
                         time.sleep(0.001)
             
             # Release video writer
-            out.release()
+            if raw_writer:
+                raw_writer.close()
+            else:
+                out.release()
+            if proxy_out:
+                proxy_out.release()
+            
+            # Hand the session over to the processing queue
+            self.queue_session(session)
             
             # Update UI on main thread
             self.root.after(0, self.recording_finished)
@@ -773,134 +3139,558 @@ class ScreenRecorder:
                                                            f"Recording failed: {str(e)}"))
             self.root.after(0, self.recording_finished)
     
-    def record_audio(self):
+    def open_audio_source(self, audio, name, device_index, gain):
+        """Open a device in its native format with a converter to the output format"""
+        capture_rate, capture_channels = self.negotiate_audio_format(audio, device_index,
+                                                                     self.audio_channels)
+        converter = AudioConverter(capture_rate, capture_channels, self.audio_rate, self.audio_channels)
+        print(f"Audio source '{name}': {capture_rate} Hz, {capture_channels} ch -> "
+              f"{self.audio_rate} Hz, {self.audio_channels} ch")
+        
+        stream_kwargs = {
+            'format': self.audio_format,
+            'channels': capture_channels,
+            'rate': capture_rate,
+            'input': True,
+            'frames_per_buffer': self.audio_chunk
+        }
+        
+        # Add input_device_index only if not None (system default)
+        if device_index is not None:
+            stream_kwargs['input_device_index'] = device_index
+        
+        stream = audio.open(**stream_kwargs)
+        return AudioSource(name, stream, self.audio_chunk, converter, gain=gain,
+                           capacity=self.audio_rate * 2)
+    
+    def record_audio(self, session):
+        audio_filename = session['audio_filename']
+        audio_frames = session['audio_frames']
+        audio_levels = session['audio_levels']
         try:
             # Initialize PyAudio
             audio = pyaudio.PyAudio()
             
-            # Get selected audio device index
-            audio_device_index = self.get_selected_audio_device_index()
+            # The microphone is the master source, its stream clocks the mix
+            microphone = self.open_audio_source(audio, "microphone", self.get_selected_audio_device_index(),
+                                                self.mic_gain)
+            sources = [microphone]
+            self.audio_capture_rate = microphone.converter.in_rate
+            session['audio_capture_rate'] = self.audio_capture_rate
             
-            # Open audio stream with selected device
-            stream_kwargs = {
-                'format': self.audio_format,
-                'channels': self.audio_channels,
-                'rate': self.audio_rate,
-                'input': True,
-                'frames_per_buffer': self.audio_chunk
-            }
+            system_audio_index = self.get_selected_system_audio_index()
+            if system_audio_index is not None:
+                try:
+                    sources.append(self.open_audio_source(audio, "system", system_audio_index,
+                                                          self.system_audio_gain))
+                except Exception as e:
+                    print(f"Could not open system audio, recording microphone only: {e}")
+            
+            mixer = AudioMixer(sources, self.audio_channels, block_frames=self.audio_chunk,
+                               limiter_threshold=self.limiter_threshold)
+            print(f"Audio output: {self.audio_rate} Hz, {self.audio_channels} ch ({self.audio_codec}), "
+                  f"{len(sources)} source(s)")
             
-            # Add input_device_index only if not None (system default)
-            if audio_device_index is not None:
-                stream_kwargs['input_device_index'] = audio_device_index
+            # Compressed output is encoded while recording instead of kept in memory
+            encoder = None
+            if self.audio_codec != "wav":
+                encoder = AudioEncoder(audio_filename, self.audio_rate, self.audio_channels,
+                                       self.audio_codec, self.settings.get('audio_bitrate'))
             
-            stream = audio.open(**stream_kwargs)
+            for source in sources[1:]:
+                source.thread = threading.Thread(target=source.capture_worker, args=(self,))
+                source.thread.daemon = True
+                source.thread.start()
             
             # Record audio frames
             while self.is_recording:
-                data = stream.read(self.audio_chunk)
-                self.audio_frames.append(data)
+                data = microphone.stream.read(self.audio_chunk, exception_on_overflow=False)
+                
+                # Keep draining the device while paused but drop the audio
+                if self.is_paused:
+                    continue
+                
+                chunk_time = self.sync_clock.now()
+                self.sync_clock.mark_audio_chunk(chunk_time, self.audio_chunk)
+                
+                microphone.push(data, chunk_time)
+                for block_time, block in mixer.mix_available():
+                    audio_levels.append((block_time, self.calculate_audio_level(block)))
+                    if encoder:
+                        encoder.write(block)
+                    else:
+                        audio_frames.append(block)
             
-            # Stop and close stream
-            stream.stop_stream()
-            stream.close()
+            tail = mixer.flush()
+            if tail:
+                if encoder:
+                    encoder.write(tail)
+                else:
+                    audio_frames.append(tail)
+            
+            # Stop and close streams
+            for source in sources[1:]:
+                source.thread.join(timeout=2)
+            for source in sources:
+                source.stream.stop_stream()
+                source.stream.close()
             audio.terminate()
             
-            # Save audio to file
-            with wave.open(self.audio_filename, 'wb') as wf:
-                wf.setnchannels(self.audio_channels)
-                wf.setsampwidth(audio.get_sample_size(self.audio_format))
-                wf.setframerate(self.audio_rate)
-                wf.writeframes(b''.join(self.audio_frames))
+            if encoder:
+                # Wait for the encoder to finish the file
+                encoder.close()
+            else:
+                # Save audio to file
+                with wave.open(audio_filename, 'wb') as wf:
+                    wf.setnchannels(self.audio_channels)
+                    wf.setsampwidth(audio.get_sample_size(self.audio_format))
+                    wf.setframerate(self.audio_rate)
+                    wf.writeframes(b''.join(audio_frames))
                 
         except Exception as e:
             print(f"Audio recording error: {e}")
     
     def stop_recording(self):
+        if self.is_paused:
+            self.sync_clock.resume()
+            self.is_paused = False
+        self.session['idle_mode'] = {"Cut": "cut", "Speed up": "speedup"}.get(self.idle_mode_var.get(), "keep")
         self.is_recording = False
+        
+        # No new session until this one is handed over to the processing queue
+        self.record_btn.config(state="disabled")
+        self.pause_btn.config(state="disabled")
+        self.status_label.config(text="Finishing recording...")
     
-    def recording_finished(self):
-        self.record_btn.config(text="Start Recording")
-        self.status_label.config(text="Processing...")
+    def toggle_pause(self):
+        """Pause or resume the current session without reopening any device"""
+        if not self.is_recording:
+            return
         
-        # Disable all UI controls during processing
-        self.set_ui_controls_enabled(False)
+        if not self.is_paused:
+            # Stop capture first, then freeze the clock
+            self.is_paused = True
+            self.sync_clock.pause()
+            self.pause_btn.config(text="Resume")
+            self.status_label.config(text="Paused")
+        else:
+            # Restart the clock first so the first new frame lands right after the splice
+            self.sync_clock.resume()
+            self.is_paused = False
+            self.pause_btn.config(text="Pause")
+            self.status_label.config(text="Recording...")
+    
+    def recording_finished(self):
+        self.input_recorder.stop()  # Already stopped unless capture failed
+        self.record_btn.config(text="Start Recording", state="normal")
+        self.pause_btn.config(text="Pause", state="disabled")
+        self.raw_capture_check.config(state="normal")
+        self.proxy_check.config(state="normal")
+        self.profile_dropdown.config(state="readonly")
+        self.auto_tune_btn.config(state="normal")
+        self.status_label.config(text="Ready to record")
         
-        # Combine audio and video in a separate thread
-        combine_thread = threading.Thread(target=self.combine_audio_video)
-        combine_thread.daemon = True
-        combine_thread.start()
+        # Deferred raw encodes may start now
+        self.processing_queue.wake()
     
-    def combine_audio_video(self):
+    def queue_session(self, session):
+        """Measure sync for the finished session and queue its mux (capture thread)"""
         try:
-            # Wait a moment for audio file to be fully written
-            time.sleep(1)
+            # Wait for the audio file and the input track to be fully written
+            if session['audio_thread']:
+                session['audio_thread'].join(timeout=5)
+            self.input_recorder.stop()
             
-            # Check if both files exist
-            if os.path.exists(self.current_filename) and os.path.exists(self.audio_filename):
-                # Load video and audio
-                video_clip = VideoFileClip(self.current_filename)
-                audio_clip = AudioFileClip(self.audio_filename)
-                
-                # Combine video with audio
-                final_clip = video_clip.set_audio(audio_clip)
-                
-                # Generate final filename
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                final_filename = os.path.join(self.output_folder, f"final_recording_{timestamp}.mp4")
-                
-                # Write final video with audio
-                final_clip.write_videofile(final_filename, codec='libx264', audio_codec='aac')
-                
-                # Clean up clips
-                video_clip.close()
-                audio_clip.close()
-                final_clip.close()
-                
-                # Remove temporary files
+            # Measure offset and drift between the two streams
+            self.sync_info = self.sync_clock.compute_sync(session['video_fps'], session['audio_capture_rate'])
+            if self.sync_info:
+                print(f"A/V sync: offset {self.sync_info['offset'] * 1000:.1f} ms, "
+                      f"video {self.sync_info['video_fps']:.2f} fps, "
+                      f"audio drift {self.sync_info['drift'] * 1e6:.0f} ppm")
+            
+            # Generate final filename
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            final_filename = os.path.join(self.output_folder, f"final_recording_{timestamp}.mp4")
+            
+            job = ProcessingJob(session['video_filename'], session['audio_filename'],
+                                final_filename, self.sync_info, devices=session['devices'])
+            
+            # Low-bitrate proxy sharing the archive's audio track
+            if session['proxy_scale'] is not None:
+                job.proxy_video_filename = session['proxy_filename']
+                job.proxy_final_filename = final_filename[:-len(".mp4")] + "_proxy.mp4"
+                job.proxy_scale = session['proxy_scale']
+            
+            job.events_filename = session['events_filename']
+            
+            # Idle spans come from the statistics gathered during capture, no decode needed
+            job.idle_mode = session['idle_mode']
+            if job.idle_mode != "keep":
+                video_start = self.sync_info['video_start'] if self.sync_info else 0.0
+                input_times = []
                 try:
-                    os.remove(self.current_filename)  # Remove video-only file
-                    os.remove(self.audio_filename)    # Remove audio-only file
-                except:
-                    pass
+                    input_times = np.sort(InputEventRecorder.read(session['events_filename'])[1]['t']).tolist()
+                except Exception as e:
+                    print(f"Could not read input events for idle detection: {e}")
+                spans = self.idle_detector.detect(session['video_activity'], session['audio_levels'],
+                                                  input_times)
+                job.idle_spans = [[start - video_start, end - video_start] for start, end in spans]
+                print(f"Idle detection: {len(job.idle_spans)} spans, "
+                      f"{sum(end - start for start, end in job.idle_spans):.1f} s")
+            
+            # Raw captures are random access: leave room to trim before the single export
+            if job.video_filename.endswith(".raw") and self.settings.get('hold_raw_exports'):
+                job.status = "held"
+                self.root.after(0, lambda: self.info_label.config(
+                    text="Raw capture held: trim or export it in the Processing Queue"))
+            
+            self.processing_queue.submit(job)
+        except Exception as e:
+            print(f"Error queueing recording: {e}")
+    
+    def run_processing_job(self, job, logger):
+        """Run one queued job on a queue worker thread"""
+        return self.mux_recording(job, logger=logger)
+    
+    def mux_recording(self, job, logger='bar'):
+        """Combine a video-only and an audio-only file into the final recording (and its proxy)"""
+        # Check if both files exist (video-only jobs have no audio file)
+        if not os.path.exists(job.video_filename):
+            return False
+        if job.audio_filename and not os.path.exists(job.audio_filename):
+            return False
+        make_proxy = job.proxy_final_filename is not None
+        if make_proxy and job.proxy_video_filename and not os.path.exists(job.proxy_video_filename):
+            return False
+        
+        # Load video and audio
+        raw_reader = None
+        proxy_source = None
+        if job.video_filename.endswith(".raw"):
+            # Raw frames carry their own timestamps, no retiming needed
+            raw_reader = RawFrameReader(job.video_filename)
+            fps = job.sync_info['video_fps'] if job.sync_info else self.video_fps
+            video_clip = raw_reader.to_clip(fps, job.sync_info)
+        else:
+            video_clip = VideoFileClip(job.video_filename)
+        # AAC captured while recording goes in untouched when no edit or correction needs the samples
+        copy_audio = self.can_copy_audio(job)
+        audio_clip = AudioFileClip(job.audio_filename) if job.audio_filename and not copy_audio else None
+        shared_audio = os.path.splitext(job.final_filename)[0] + "_audio.m4a"
+        # moviepy's intermediate audio, kept in the recordings folder so an aborted encode can be cleaned up
+        temp_audio = os.path.splitext(job.final_filename)[0] + "TEMP_MPY_wvf_snd.m4a"
+        
+        try:
+            final_clip = self.build_export_clip(video_clip, audio_clip, job)
+            
+            audio_track = None  # Encoded audio file both outputs copy
+            if copy_audio:
+                audio_track = job.audio_filename
+                self.set_progress_stage(logger, 0.0, 0.7 if make_proxy else 1.0)
+                # moviepy would re-encode an audio file argument to MP3 unless told to copy it
+                final_clip.write_videofile(job.final_filename, codec='libx264', audio=audio_track,
+                                           audio_codec='copy', logger=logger)
+            elif not make_proxy:
+                # Write final video with audio
+                final_clip.write_videofile(job.final_filename, codec='libx264', audio_codec='aac',
+                                           temp_audiofile=temp_audio, logger=logger)
+            else:
+                self.set_progress_stage(logger, 0.0, 0.1)
+                if final_clip.audio is not None:
+                    # Encode the audio track once, both outputs copy it
+                    audio_track = shared_audio
+                    final_clip.audio.write_audiofile(shared_audio, fps=44100, codec='aac', logger=logger)
                 
-                # Update filename reference
-                self.current_filename = final_filename
+                self.set_progress_stage(logger, 0.1, 0.6)
+                final_clip.write_videofile(job.final_filename, codec='libx264', audio=audio_track or False,
+                                           audio_codec='copy', logger=logger)
+            
+            if make_proxy:
+                # Proxy frames come from the downscaled capture, or are scaled from the raw frames
+                if raw_reader:
+                    width = int(video_clip.w * job.proxy_scale) // 2 * 2
+                    height = int(video_clip.h * job.proxy_scale) // 2 * 2
+                    proxy_source = video_clip.fx(vfx.resize, newsize=(width, height))
+                else:
+                    proxy_source = VideoFileClip(job.proxy_video_filename)
                 
-            # Update UI on main thread
-            self.root.after(0, self.processing_finished)
+                # Same sync, trim and idle edits so the shared audio lines up
+                proxy_clip = self.build_export_clip(proxy_source, None, job)
+                self.set_progress_stage(logger, 0.7, 0.3)
+                proxy_clip.write_videofile(job.proxy_final_filename, codec='libx264', audio=audio_track or False,
+                                           audio_codec='copy', bitrate=self.settings.get('proxy_bitrate'),
+                                           logger=logger)
+                proxy_clip.close()
+            final_clip.close()
+        finally:
+            # Clean up clips
+            video_clip.close()
+            if audio_clip:
+                audio_clip.close()
+            if proxy_source:
+                proxy_source.close()
+            if raw_reader:
+                raw_reader.close()
+            # Intermediate audio goes whether the encode finished, failed or was cancelled
+            for filename in (shared_audio, temp_audio):
+                if os.path.exists(filename):
+                    try:
+                        os.remove(filename)
+                    except:
+                        pass
+        
+        # Remove temporary files
+        temporary_files = [job.video_filename]  # Video-only file
+        if job.audio_filename:
+            temporary_files.append(job.audio_filename)  # Audio-only file
+        if raw_reader:
+            temporary_files.append(job.video_filename + ".json")  # Raw frame index
+        if make_proxy and job.proxy_video_filename:
+            temporary_files.append(job.proxy_video_filename)
+        for filename in temporary_files:
+            try:
+                os.remove(filename)
+            except:
+                pass
+        
+        # Keep the input track next to the recording so the cursor can be restyled or removed later
+        if job.events_filename and os.path.exists(job.events_filename):
+            events_filename = os.path.splitext(job.final_filename)[0] + ".events"
+            try:
+                os.replace(job.events_filename, events_filename)
+                job.events_filename = events_filename
+            except OSError as e:
+                print(f"Could not keep input events: {e}")
+        
+        return True
+    
+    def can_copy_audio(self, job, tolerance=0.02):
+        """True when the captured AAC track can be stream-copied: no edits and sync within tolerance"""
+        if not job.audio_filename or os.path.splitext(job.audio_filename)[1] != AudioEncoder.extension("aac"):
+            return False
+        if job.trim or (job.idle_mode != "keep" and job.idle_spans):
+            return False
+        sync = job.sync_info
+        if not sync:
+            return True
+        # Start offset and the drift accumulated by the end must both stay below the tolerance
+        return abs(sync['offset']) <= tolerance and abs(sync['drift']) * sync['audio_duration'] <= tolerance
+    
+    def set_progress_stage(self, logger, start, span):
+        if isinstance(logger, JobProgressLogger):
+            logger.set_stage(start, span)
+    
+    def build_export_clip(self, video_clip, audio_clip, job):
+        """Apply sync correction, trim and idle edits of a job (audio_clip may be None)"""
+        # Line both streams up on the shared clock
+        corrected_video, corrected_audio = self.apply_sync_correction(video_clip, audio_clip, job.sync_info)
+        
+        # Composite the input track on the corrected timeline, before any edits move frames around
+        corrected_video = self.apply_input_overlay(corrected_video, job)
+        
+        # Combine video with audio
+        if corrected_audio is not None:
+            clip = corrected_video.set_audio(corrected_audio)
+        else:
+            clip = corrected_video.without_audio()
+        
+        # Cut to the requested range (random access for raw intermediates)
+        idle_spans = job.idle_spans or []
+        if job.trim:
+            start, end = job.trim
+            end = min(end, clip.duration) if end else clip.duration
+            start = min(start, end)
+            clip = clip.subclip(start, end)
+            idle_spans = [[span_start - start, span_end - start] for span_start, span_end in idle_spans]
+        
+        # Drop or speed up idle segments
+        return self.apply_idle_edit(clip, idle_spans, job.idle_mode)
+    
+    def apply_input_overlay(self, clip, job):
+        """Draw the cursor, click highlights and zoom from the job's input event track"""
+        settings = self.settings
+        cursor = settings.get('cursor_overlay')
+        clicks = settings.get('click_highlights')
+        zoom = max(1.0, settings.get('cursor_zoom'))
+        if not job.events_filename or not (cursor or clicks or zoom > 1.0):
+            return clip
+        
+        try:
+            screen_size, events = InputEventRecorder.read(job.events_filename)
+        except Exception as e:
+            print(f"Could not read input events, exporting without cursor: {e}")
+            return clip
+        
+        time_offset = job.sync_info['video_start'] if job.sync_info else 0.0
+        overlay = InputOverlay(self, events, screen_size, (clip.w, clip.h), time_offset,
+                               cursor=cursor, clicks=clicks, zoom=zoom)
+        if overlay.is_empty():
+            return clip
+        return clip.fl(overlay.apply)
+    
+    def apply_idle_edit(self, clip, idle_spans, mode):
+        """Cut or speed up idle spans, edited in the same export pass"""
+        if mode == "keep" or not idle_spans:
+            return clip
+        
+        segments = []
+        position = 0.0
+        for start, end in idle_spans:
+            start = max(start, position)
+            end = min(end, clip.duration)
+            if end <= start:
+                continue
+            if start > position:
+                segments.append(clip.subclip(position, start))
+            if mode == "speedup":
+                segments.append(clip.subclip(start, end).fx(vfx.speedx, self.idle_speed))
+            position = end
+        if position < clip.duration:
+            segments.append(clip.subclip(position, clip.duration))
+        
+        if not segments:
+            return clip
+        return concatenate_videoclips(segments)
+    
+    def toggle_replay_buffer(self):
+        """Start or stop the rolling instant replay buffer"""
+        if self.replay_var.get():
+            self.replay_buffer.start()
+            self.save_replay_btn.config(state="normal")
+        else:
+            self.replay_buffer.stop()
+            self.save_replay_btn.config(state="disabled")
+    
+    def save_replay(self):
+        """Save the buffered history without touching the capture in progress"""
+        self.save_replay_btn.config(state="disabled")
+        self.status_label.config(text="Saving replay...")
+        
+        save_thread = threading.Thread(target=self.save_replay_worker)
+        save_thread.daemon = True
+        save_thread.start()
+    
+    def save_replay_worker(self):
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            video_filename = os.path.join(self.output_folder, f"replay_video_{timestamp}.mp4")
+            audio_filename = os.path.join(self.output_folder, f"replay_audio_{timestamp}.wav")
+            final_filename = os.path.join(self.output_folder, f"replay_{timestamp}.mp4")
             
+            sync_info, has_audio = self.replay_buffer.save(video_filename, audio_filename)
+            if sync_info:
+                self.processing_queue.submit(ProcessingJob(video_filename, audio_filename if has_audio else None,
+                                                           final_filename, sync_info))
+                self.root.after(0, lambda: self.replay_saved(True))
+            else:
+                self.root.after(0, lambda: self.replay_saved(False))
         except Exception as e:
-            print(f"Error combining audio and video: {e}")
-            # Update UI even if combining failed
-            self.root.after(0, self.processing_finished)
+            print(f"Error saving replay: {e}")
+            self.root.after(0, lambda: self.replay_saved(False))
     
-    def processing_finished(self):
-        # Re-enable all UI controls after processing
-        self.set_ui_controls_enabled(True)
+    def replay_saved(self, queued):
+        if self.replay_var.get():
+            self.save_replay_btn.config(state="normal")
+        if queued:
+            self.status_label.config(text="Replay queued for processing")
+        else:
+            self.status_label.config(text="Nothing to save yet")
+        self.root.after(3000, lambda: self.status_label.config(
+            text="Recording..." if self.is_recording else "Ready to record"))
+    
+    def apply_sync_correction(self, video_clip, audio_clip, sync):
+        """Retime both clips to the measured clock, applied during the single mux encode"""
+        if not sync:
+            return video_clip, audio_clip
+        
+        # Video was written with the nominal fps, stretch it to the real frame rate
+        video_clip = video_clip.fx(vfx.speedx, final_duration=sync['video_duration'])
+        if audio_clip is None:
+            return video_clip, None
+        
+        # Resample audio so device clock drift does not accumulate
+        audio_clip = audio_clip.fx(vfx.speedx, final_duration=sync['audio_duration'])
+        
+        # Shift audio by the start offset between the streams
+        offset = sync['offset']
+        if offset > 0:
+            # Audio started late: delay it
+            audio_clip = CompositeAudioClip([audio_clip.set_start(offset)])
+        elif offset < 0:
+            # Audio started early: trim the head
+            audio_clip = audio_clip.subclip(min(-offset, audio_clip.duration))
+        
+        # Never let the audio run past the end of the video
+        if audio_clip.duration > video_clip.duration:
+            audio_clip = audio_clip.set_duration(video_clip.duration)
+        
+        return video_clip, audio_clip
+    
+    def update_processing_status(self):
+        """Refresh the queue button and window with current job progress"""
+        jobs = self.processing_queue.snapshot()
+        running = [job for job in jobs if job.status == "running"]
+        pending = [job for job in jobs if job.status in ("queued", "running")]
+        held = [job for job in jobs if job.status == "held"]
+        
+        if running:
+            self.processing_btn.config(text=f"Processing ({len(pending)}) {running[0].progress * 100:.0f}%")
+        elif pending:
+            self.processing_btn.config(text=f"Processing Queue ({len(pending)})")
+        elif held:
+            self.processing_btn.config(text=f"Processing Queue ({len(held)} held)")
+        else:
+            self.processing_btn.config(text="Processing Queue")
+        
+        self.processing_window.refresh()
+    
+    def processing_finished(self, job):
+        self.update_processing_status()
+        
+        if job.status != "done":
+            if job.status == "failed":
+                self.info_label.config(text=f"Processing failed: {os.path.basename(job.final_filename)}")
+            return
+        
+        self.current_filename = job.final_filename
+        
+        # Index right away so the browser has it without waiting for the watcher
+        index_thread = threading.Thread(target=self.recordings_index.add, args=(job.final_filename, job.devices))
+        index_thread.daemon = True
+        index_thread.start()
+        
+        # Don't interrupt a recording in progress with a dialog
+        if self.is_recording:
+            self.info_label.config(text=f"Saved: {job.final_filename}")
+            return
         
         self.status_label.config(text="Recording saved!")
         
         # Show success message with option to open file
         result = messagebox.askyesno("Recording Complete", 
-                                   f"Recording saved as:\n{self.current_filename}\n\nOpen recordings folder?")
+                                   f"Recording saved as:\n{job.final_filename}\n\nOpen recordings folder?")
         if result:
             self.open_recordings_folder()
         
         # Reset info label after 3 seconds
         self.root.after(3000, lambda: self.info_label.config(text=""))
-        self.root.after(3000, lambda: self.status_label.config(text="Ready to record"))
+        self.root.after(3000, lambda: self.status_label.config(
+            text="Recording..." if self.is_recording else "Ready to record"))
     
     def open_recordings_folder(self):
+        self.open_path(self.output_folder)
+    
+    def open_path(self, path):
+        """Open a file or folder with the platform default application"""
         try:
             if sys.platform == "win32":
-                os.startfile(self.output_folder)
+                os.startfile(path)
             elif sys.platform == "darwin":
-                subprocess.run(["open", self.output_folder])
+                subprocess.run(["open", path])
             else:
-                subprocess.run(["xdg-open", self.output_folder])
+                subprocess.run(["xdg-open", path])
         except Exception as e:
-            messagebox.showerror("Error", f"Could not open folder: {str(e)}")
+            messagebox.showerror("Error", f"Could not open {path}: {str(e)}")
     
     def toggle_self_view(self):
         if self.self_view_var.get():
@@ -915,6 +3705,9 @@ class ScreenRecorder:
     def on_closing(self):
         # Clean up
         self.is_recording = False
+        self.replay_buffer.stop()     # Stop instant replay capture
+        self.processing_queue.stop()  # Unfinished jobs resume on next launch
+        self.recordings_index.stop_watching()
         self.stop_audio_monitoring()  # Stop audio monitoring
         self.stop_camera_preview()    # Stop camera preview
         self.self_view.close_window()